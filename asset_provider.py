@@ -0,0 +1,68 @@
+import hashlib
+import mmap
+import threading
+import zipfile
+
+
+class _MappedFile:
+    # zipfile needs seekable(), which mmap objects only have since Python 3.13
+
+    def __init__(self, mapped: mmap.mmap):
+        self._mmap = mapped
+        self.read = mapped.read
+        self.seek = mapped.seek
+        self.tell = mapped.tell
+
+    def seekable(self) -> bool:
+        return True
+
+
+class AssetProvider:
+    """Reads members of assets.zip on demand, straight from the memory-mapped archive.
+
+    ``TemplateStore.install_zip`` turns the archive into a template pack, files
+    that have to exist on disk are materialized from there.
+    """
+
+    def __init__(self, zip_path: str):
+        self.zip_path = zip_path
+        self._lock = threading.Lock()
+        self._file = None
+        self._mmap: mmap.mmap | None = None
+        self._zip: zipfile.ZipFile | None = None
+        self._digest: str | None = None
+
+    def _archive(self) -> zipfile.ZipFile:
+        with self._lock:
+            if self._zip is None:
+                self._file = open(self.zip_path, "rb")  # noqa: SIM115
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._zip = zipfile.ZipFile(_MappedFile(self._mmap))
+            return self._zip
+
+    def close(self):
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+                self._mmap.close()
+                self._file.close()
+                self._zip = self._mmap = self._file = None
+
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            self._archive()
+            self._digest = hashlib.sha256(self._mmap).hexdigest()
+        return self._digest
+
+    def infolist(self) -> list[zipfile.ZipInfo]:
+        return self._archive().infolist()
+
+    def members(self, name: str) -> list[zipfile.ZipInfo]:
+        prefix = name.rstrip("/") + "/"
+        return [info for info in self._archive().infolist() if info.filename == name or info.filename.startswith(prefix)]
+
+    def read_bytes(self, name: str) -> bytes:
+        archive = self._archive()
+        with self._lock:
+            return archive.read(name)
@@ -0,0 +1,268 @@
+"""start-project without prompts for every project listed in a spec file.
+
+The spec is TOML (Python 3.11+) or JSON with the same keys. ``[defaults]``
+apply to every entry of ``[[projects]]``, keys left out get the defaults of
+the interactive questions::
+
+    base_dir = "projects"   # relative to the spec file  [default: its folder]
+    workers = 4             # projects created at the same time
+    jobs = 2                # steps run at the same time in each project
+
+    [defaults]
+    deploy_option = "docker"
+    packages = ["django-ninja", "djangorestframework", "django-cors-headers"]
+    performance_profile = "default"
+    nextjs = false
+    superuser = { username = "admin", email = "admin@example.com", password = "secret" }
+
+    [[projects]]
+    name = "shop"
+    nextjs = true
+    nextjs_project_name = "storefront"
+    template = "templates/shop.zip"
+
+Every project is created by a worker process in ``<base_dir>/<name>``, with
+the output of the run and of the tools it starts in ``<base_dir>/<name>.log``
+and its temporary files in a folder of its own. The shared caches (venvs,
+Next.js template, wheels) lock their entries, so workers reuse what another
+one stored and never see it half written. Projects needing a venv that is not
+cached yet wait until the first of them has stored it, instead of all
+installing the same packages at once.
+"""
+
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+PROJECT_KEYS = {"name", "deploy_option", "packages", "performance_profile", "nextjs", "nextjs_project_name", "template", "superuser"}
+NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]*")
+
+
+def load_spec(path: str) -> dict:
+    with open(path, "rb") as spec_file:
+        data = spec_file.read()
+    if path.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError("TOML specs need Python 3.11 or newer, use a JSON spec") from None
+        return tomllib.loads(data.decode())
+    return json.loads(data)
+
+
+def project_answers(entry: dict, defaults: dict) -> dict:
+    """The answers of one ``[[projects]]`` entry, in the form apply_answers takes."""
+    import entrypoints
+    import performance_profiles
+    from project_manager import DjangoProjectManager
+
+    entry = {**defaults, **entry}
+    unknown = sorted(set(entry) - PROJECT_KEYS)
+    if unknown:
+        raise ValueError(f"unknown keys {', '.join(unknown)}")
+
+    deploy_option = entry.get("deploy_option", "mydevil")
+    if deploy_option not in DjangoProjectManager.deploy_options:
+        raise ValueError(f"deploy_option must be one of {', '.join(DjangoProjectManager.deploy_options)}")
+    packages = entry.get("packages", DjangoProjectManager.default_packages)
+    unknown = [package for package in packages if package not in DjangoProjectManager.package_choices]
+    if unknown:
+        raise ValueError(f"unknown packages {', '.join(unknown)}, choose from {', '.join(DjangoProjectManager.package_choices)}")
+    profile = entry.get("performance_profile", "default")
+    if profile not in performance_profiles.PROFILES:
+        raise ValueError(f"performance_profile must be one of {', '.join(performance_profiles.PROFILES)}")
+
+    # the same order select_python_packages builds, it is part of the venv cache key
+    to_install = [*DjangoProjectManager.to_install, *(package for package in DjangoProjectManager.package_choices if package in packages)]
+    if deploy_option == "docker":
+        to_install.extend(entrypoints.DOCKER_SERVER_PACKAGES)
+    to_install.extend(performance_profiles.PROFILE_PACKAGES.get(profile, []))
+
+    superuser = {"username": "admin", "email": "admin@example.com", "password": "!@#qwerty", **entry.get("superuser", {})}
+    if "users" in to_install:
+        superuser.pop("username")  # the custom user model logs in with the email
+
+    create_next_js = bool(entry.get("nextjs", True))
+    nextjs_project_name = None
+    if create_next_js:
+        nextjs_project_name = "public_nodejs" if deploy_option == "mydevil" else entry.get("nextjs_project_name", "frontend")
+    return {
+        "deploy_option": deploy_option,
+        "to_install": to_install,
+        "performance_profile": profile,
+        "create_next_js": create_next_js,
+        "nextjs_project_name": nextjs_project_name,
+        "superuser": superuser,
+        "template": entry.get("template"),
+    }
+
+
+def plan(spec: dict, spec_dir: str, base_dir: str | None = None, jobs: int | None = None, resume: bool = False) -> tuple[list[dict], list[dict]]:
+    """Jobs for the worker processes, and failed results for the projects that cannot start.
+
+    Raises ``ValueError`` for a spec that cannot be used at all.
+    """
+    base_dir = os.path.abspath(os.path.join(spec_dir, base_dir or spec.get("base_dir", ".")))
+    defaults = spec.get("defaults", {})
+    projects = spec.get("projects", [])
+    if not projects:
+        raise ValueError("The spec lists no [[projects]]")
+
+    planned, failed, names = [], [], set()
+    for index, entry in enumerate(projects):
+        name = entry.get("name")
+        label = f"projects[{index}]" + (f" ({name})" if name else "")
+        if not isinstance(name, str) or not NAME.fullmatch(name):
+            raise ValueError(f"{label}: name must be a folder name (letters, digits, '.', '_', '-')")
+        if name in names:
+            raise ValueError(f"{label}: there is another project named {name}")
+        names.add(name)
+        try:
+            answers = project_answers(entry, defaults)
+        except ValueError as exc:
+            raise ValueError(f"{label}: {exc}") from None
+        if answers["template"] and os.path.exists(os.path.join(spec_dir, answers["template"])):
+            answers["template"] = os.path.abspath(os.path.join(spec_dir, answers["template"]))
+
+        job = {
+            "name": name,
+            "base_dir": base_dir,
+            "project_dir": os.path.join(base_dir, name),
+            "log": os.path.join(base_dir, f"{name}.log"),
+            "jobs": jobs or spec.get("jobs"),
+            "resume": resume,
+            "answers": answers,
+        }
+        if os.path.exists(job["project_dir"]) and not resume:
+            failed.append({**result(job, error="the folder already exists, remove it or use --resume"), "log": None})
+        else:
+            planned.append(job)
+    return planned, failed
+
+
+def result(job: dict, ok: bool = False, seconds: float = 0.0, error: str | None = None) -> dict:
+    return {"name": job["name"], "ok": ok, "seconds": round(seconds, 2), "error": error, "path": job["project_dir"], "log": job["log"]}
+
+
+def create_one(job: dict) -> dict:
+    """Worker: create one project, with stdin closed and stdout/stderr going to its log."""
+    started = time.perf_counter()
+    os.makedirs(job["base_dir"], exist_ok=True)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(fd) for fd in (0, 1, 2)]
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    log = os.open(job["log"], os.O_WRONLY | os.O_CREAT | (os.O_APPEND if job["resume"] else os.O_TRUNC), 0o644)
+    os.dup2(devnull, 0)
+    os.dup2(log, 1)
+    os.dup2(log, 2)
+    # pip, npm and tempfile put their temporary files here instead of a folder shared by all workers
+    temp_dir = tempfile.mkdtemp(prefix=f"yadpm-{job['name']}-")
+    saved_tmpdir = os.environ.get("TMPDIR")
+    os.environ["TMPDIR"] = temp_dir
+    tempfile.tempdir = None
+    error = None
+    try:
+        from project_manager import DjangoProjectManager
+
+        manager = DjangoProjectManager(jobs=job["jobs"], resume=job["resume"])
+        manager.BASE_DIR = job["base_dir"]
+        manager.configure(job["name"], job["answers"])
+        manager.run_steps()
+    except SystemExit as exc:
+        if exc.code:
+            error = f"exit code {exc.code}"
+    except KeyboardInterrupt:
+        error = "interrupted"
+    except Exception as exc:
+        traceback.print_exc()
+        error = f"{type(exc).__name__}: {exc}"
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # the worker process is reused for the next project
+        for fd, saved_fd in enumerate(saved):
+            os.dup2(saved_fd, fd)
+            os.close(saved_fd)
+        os.close(devnull)
+        os.close(log)
+        if saved_tmpdir is None:
+            os.environ.pop("TMPDIR", None)
+        else:
+            os.environ["TMPDIR"] = saved_tmpdir
+        tempfile.tempdir = None
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return result(job, ok=error is None, seconds=time.perf_counter() - started, error=error)
+
+
+def venv_key(job: dict, python: str) -> str:
+    from venv_cache import VenvCache
+
+    # DjangoProjectManager.python_packages, "users" is not installed from PyPI
+    return VenvCache.key(python, [package for package in job["answers"]["to_install"] if package != "users"])
+
+
+def run(jobs: list[dict], workers: int, on_result=None) -> list[dict]:
+    """Create the projects on ``workers`` processes, ``on_result`` is called as each one finishes."""
+    from venv_cache import VenvCache, python_version
+
+    venv_cache = VenvCache()
+    python = python_version("python3")
+    results = []
+    # venv key -> the project building that venv, and the projects held until it is cached
+    leaders, held = {}, {}
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+        futures = {}
+        for job in jobs:
+            key = venv_key(job, python)
+            if key in leaders:
+                held.setdefault(key, []).append(job)
+                continue
+            future = pool.submit(create_one, job)
+            futures[future] = job
+            if not venv_cache.has(key):
+                leaders[key] = future
+
+        try:
+            while futures:
+                done, _ = wait(futures, timeout=1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = futures.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as exc:  # a worker that died takes its project with it
+                        outcome = result(job, error=f"{type(exc).__name__}: {exc}")
+                    results.append(outcome)
+                    if on_result is not None:
+                        on_result(outcome)
+                # a failed leader releases the others too, each then installs the packages itself
+                for key in [key for key in held if venv_cache.has(key) or leaders[key].done()]:
+                    for job in held.pop(key):
+                        futures[pool.submit(create_one, job)] = job
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            raise
+    return results
+
+
+def summary(results: list[dict], workers: int, wall: float) -> dict:
+    created = [item for item in results if item["ok"]]
+    busy = sum(item["seconds"] for item in results)
+    return {
+        "workers": workers,
+        "projects": len(results),
+        "created": len(created),
+        "failed": len(results) - len(created),
+        "wall_s": round(wall, 2),
+        "projects_per_min": round(len(created) / wall * 60, 2) if wall > 0 else 0,
+        # sum of the project times over the wall time, how many projects were in progress on average
+        "parallelism": round(busy / wall, 2) if wall > 0 else 0,
+        "results": sorted(results, key=lambda item: item["name"]),
+    }
@@ -0,0 +1,311 @@
+"""End-to-end benchmark of start-project.
+
+Runs ``DjangoProjectManager.configure`` and ``run_steps`` for every
+combination of deploy option and package set, offline: Python packages come
+from a local wheelhouse (filled once with ``pip download``) and ``npx`` is a
+stand-in that writes a minimal Next.js project. Every run is a fresh
+interpreter, like a real CLI call. ``cold`` runs start with an empty yadpm
+cache, ``warm`` runs share one that a first, untimed run filled.
+
+    python bench_scaffold.py --repeat 3 --json results.json
+    python bench_scaffold.py --deploy docker --packages full --cache warm --compare results.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+BASE_PACKAGES = ["django", "python-decouple"]
+PACKAGE_SETS = {
+    "minimal": [],
+    "default": ["django-ninja", "djangorestframework", "django-cors-headers"],
+    "full": ["django-ninja", "djangorestframework", "django-cors-headers", "users", "whitenoise[brotli]"],
+}
+DEPLOY_OPTIONS = ["mydevil", "docker", "standalone"]
+
+NPX_STUB = '''#!/usr/bin/env python3
+"""Offline stand-in for `npx create-next-app`, writes a minimal Next.js project."""
+import json
+import os
+import sys
+
+args = [arg for arg in sys.argv[1:] if not arg.startswith("-")]
+name = args[[i for i, arg in enumerate(args) if arg.startswith("create-next-app")][0] + 1]
+files = int(os.environ.get("BENCH_NODE_MODULES_FILES", "2000"))
+
+os.makedirs(os.path.join(name, "app"))
+os.makedirs(os.path.join(name, "public"))
+package = {
+    "name": name,
+    "version": "0.1.0",
+    "private": True,
+    "scripts": {"dev": "next dev", "build": "next build", "start": "next start"},
+    "dependencies": {"next": "15.0.0", "react": "19.0.0", "react-dom": "19.0.0"},
+}
+lock = {"name": name, "version": "0.1.0", "lockfileVersion": 3, "packages": {"": {"name": name, "version": "0.1.0"}}}
+with open(os.path.join(name, "package.json"), "w") as file:
+    json.dump(package, file, indent=2)
+with open(os.path.join(name, "package-lock.json"), "w") as file:
+    json.dump(lock, file, indent=2)
+with open(os.path.join(name, "next.config.ts"), "w") as file:
+    file.write('import type { NextConfig } from "next";\\n\\nconst nextConfig: NextConfig = {};\\n\\nexport default nextConfig;\\n')
+with open(os.path.join(name, "app", "page.tsx"), "w") as file:
+    file.write("export default function Home() {\\n  return <main>Hello</main>;\\n}\\n")
+
+next_dir = os.path.join(name, "node_modules", "next")
+os.makedirs(next_dir)
+with open(os.path.join(next_dir, "package.json"), "w") as file:
+    json.dump({"name": "next", "version": "15.0.0"}, file)
+# node_modules of a real project has tens of thousands of small files
+for i in range(files):
+    package_dir = os.path.join(name, "node_modules", f"package-{i // 50}")
+    os.makedirs(package_dir, exist_ok=True)
+    with open(os.path.join(package_dir, f"file-{i % 50}.js"), "w") as file:
+        file.write(f"module.exports = {i};\\n" * 20)
+'''
+
+
+def scenario_answers(deploy: str, packages: str, nextjs: bool, profile: str) -> dict:
+    import entrypoints
+    import performance_profiles
+
+    to_install = [*BASE_PACKAGES, *PACKAGE_SETS[packages]]
+    if deploy == "docker":
+        to_install.extend(entrypoints.DOCKER_SERVER_PACKAGES)
+    to_install.extend(performance_profiles.PROFILE_PACKAGES.get(profile, []))
+    users = "users" in to_install
+    return {
+        "deploy_option": deploy,
+        "to_install": to_install,
+        "performance_profile": profile,
+        "create_next_js": nextjs,
+        "nextjs_project_name": ("public_nodejs" if deploy == "mydevil" else "frontend") if nextjs else None,
+        "superuser": {"email": "admin@example.com"} if users else {"username": "admin", "email": "admin@example.com"},
+    }
+
+
+def run_worker(spec_path: str):
+    """One start-project run in this interpreter, answers and paths come from the spec file."""
+    with open(spec_path) as spec_file:
+        spec = json.load(spec_file)
+    sys.path.insert(0, str(BASE_DIR))
+    sys.argv[0] = str(BASE_DIR / "main.py")  # assets.zip and runtime/ are found next to it
+
+    from project_manager import DjangoProjectManager
+    from tracing import Tracer
+
+    manager = DjangoProjectManager(jobs=spec["jobs"], use_cache=spec["cache"] != "off", template=spec.get("template"))
+    # walking the project tree around every step would skew the timings
+    manager.tracer = Tracer(enabled=True, measure_size=False)
+    manager.BASE_DIR = spec["base_dir"]
+    answers = {**spec["answers"], "template": manager.template}
+    answers["superuser"] = {**answers["superuser"], "password": "bench-password"}  # noqa: S105
+    started = time.perf_counter()
+    try:
+        manager.configure(spec["name"], answers)
+        manager.run_steps()
+        code = 0
+    except SystemExit as exc:
+        code = exc.code or 0
+    result = {
+        "ok": code == 0,
+        "total_s": round(time.perf_counter() - started, 3),
+        "steps": {row["step"]: row["wall_s"] for row in manager.tracer.summary()},
+    }
+    with open(spec["result"], "w") as result_file:
+        json.dump(result, result_file)
+    sys.exit(code)
+
+
+def ensure_wheelhouse(wheelhouse: str, offline: bool):
+    packages = sorted({*BASE_PACKAGES, *itertools.chain(*PACKAGE_SETS.values()), "gunicorn", "uvicorn-worker", "redis"} - {"users"})
+    marker = os.path.join(wheelhouse, ".packages.json")
+    if os.path.exists(marker):
+        with open(marker) as marker_file:
+            if json.load(marker_file) == packages:
+                return
+    if offline:
+        sys.exit(f"wheelhouse {wheelhouse} is missing or incomplete, run once without --offline")
+    print(f"filling wheelhouse {wheelhouse}")
+    os.makedirs(wheelhouse, exist_ok=True)
+    # pip in the new venvs is the one bundled with python3, so download with that interpreter
+    subprocess.run(["python3", "-m", "pip", "download", "--dest", wheelhouse, "pip", "setuptools", "wheel", *packages], check=True)
+    with open(marker, "w") as marker_file:
+        json.dump(packages, marker_file)
+
+
+def bench_env(stub_dir: str, wheelhouse: str, cache_dir: str) -> dict[str, str]:
+    env = dict(os.environ)
+    env["PATH"] = stub_dir + os.pathsep + env["PATH"]
+    env["PIP_FIND_LINKS"] = wheelhouse
+    env["PIP_NO_INDEX"] = "1"
+    env["PIP_DISABLE_PIP_VERSION_CHECK"] = "1"
+    env["YADPM_CACHE_DIR"] = cache_dir
+    return env
+
+
+def run_scenario(spec: dict, env: dict[str, str], work_dir: str, log_path: str) -> dict:
+    spec = {**spec, "base_dir": work_dir, "result": os.path.join(work_dir, "result.json")}
+    spec_path = os.path.join(work_dir, "spec.json")
+    with open(spec_path, "w") as spec_file:
+        json.dump(spec, spec_file)
+
+    started = time.perf_counter()
+    with open(log_path, "a") as log:
+        log.write(f"\n==== {spec['name']} ====\n")
+        log.flush()
+        proc = subprocess.run([sys.executable, __file__, "--worker", spec_path], stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, env=env, check=False)
+    wall = time.perf_counter() - started
+
+    result = {"ok": False, "total_s": None, "steps": {}}
+    if os.path.exists(spec["result"]):
+        with open(spec["result"]) as result_file:
+            result = json.load(result_file)
+    result["ok"] = result["ok"] and proc.returncode == 0
+    result["process_s"] = round(wall, 3)
+    return result
+
+
+def git_revision() -> dict:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=BASE_DIR, capture_output=True, text=True, check=False).stdout.strip()
+
+    return {"sha": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def summarise(runs: list[dict]) -> list[dict]:
+    groups: dict[str, list[dict]] = {}
+    for run in runs:
+        groups.setdefault(run["scenario"], []).append(run)
+    summary = []
+    for scenario, group in groups.items():
+        ok = [run for run in group if run["ok"]]
+        steps = sorted({step for run in ok for step in run["steps"]})
+        summary.append(
+            {
+                "scenario": scenario,
+                "runs": len(group),
+                "failed": len(group) - len(ok),
+                "median_s": round(statistics.median(run["total_s"] for run in ok), 3) if ok else None,
+                "min_s": round(min(run["total_s"] for run in ok), 3) if ok else None,
+                "max_s": round(max(run["total_s"] for run in ok), 3) if ok else None,
+                "steps_median_s": {step: round(statistics.median(run["steps"].get(step, 0) for run in ok), 3) for step in steps},
+            },
+        )
+    return summary
+
+
+def print_summary(summary: list[dict], previous: dict | None):
+    old = {row["scenario"]: row for row in previous["summary"]} if previous else {}
+    header = f"{'scenario':<36}{'runs':>6}{'median s':>10}{'min s':>8}{'max s':>8}"
+    print(header + (f"{'before s':>10}{'change':>9}" if previous else ""))
+    for row in summary:
+        if row["median_s"] is None:
+            print(f"{row['scenario']:<36}{row['runs']:>6}{'failed':>10}")
+            continue
+        line = f"{row['scenario']:<36}{row['runs']:>6}{row['median_s']:>10.2f}{row['min_s']:>8.2f}{row['max_s']:>8.2f}"
+        before = old.get(row["scenario"], {}).get("median_s")
+        if before:
+            line += f"{before:>10.2f}{(row['median_s'] - before) / before * 100:>+8.1f}%"
+        print(line)
+        slowest = sorted(row["steps_median_s"].items(), key=lambda item: item[1], reverse=True)[:3]
+        print(" " * 4 + ", ".join(f"{step} {seconds:.2f}s" for step, seconds in slowest))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--deploy", default=",".join(DEPLOY_OPTIONS), help="comma separated deploy options")
+    parser.add_argument("--packages", default=",".join(PACKAGE_SETS), help=f"comma separated package sets: {', '.join(PACKAGE_SETS)}")
+    parser.add_argument("--nextjs", default="yes", help="comma separated: yes, no")
+    parser.add_argument("--cache", default="cold,warm", help="comma separated: cold, warm, off")
+    parser.add_argument("--profile", default="default", help="performance profile of the generated settings")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per scenario")
+    parser.add_argument("--jobs", type=int, default=None, help="start-project --jobs")
+    parser.add_argument("--wheelhouse", default=os.path.join(tempfile.gettempdir(), "yadpm-bench-wheelhouse"), help="local wheels used instead of PyPI")
+    parser.add_argument("--offline", action="store_true", help="fail instead of downloading missing wheels")
+    parser.add_argument("--node-modules-files", type=int, default=2000, help="files written into node_modules by the npx stand-in")
+    parser.add_argument("--template", help="start-project --template, a folder or zip")
+    parser.add_argument("--json", dest="json_path", help="write all runs and the summary to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare with")
+    parser.add_argument("--keep", action="store_true", help="keep the generated projects and logs")
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker)
+
+    ensure_wheelhouse(args.wheelhouse, args.offline)
+    bench_dir = tempfile.mkdtemp(prefix="yadpm-bench-")
+    stub_dir = os.path.join(bench_dir, "bin")
+    os.makedirs(stub_dir)
+    with open(os.path.join(stub_dir, "npx"), "w") as stub:
+        stub.write(NPX_STUB)
+    os.chmod(os.path.join(stub_dir, "npx"), 0o755)
+    log_path = os.path.join(bench_dir, "bench.log")
+    warm_cache = os.path.join(bench_dir, "cache-warm")
+
+    runs = []
+    matrix = itertools.product(args.cache.split(","), args.deploy.split(","), args.packages.split(","), args.nextjs.split(","))
+    try:
+        for cache, deploy, packages, nextjs in matrix:
+            scenario = f"{deploy}/{packages}/{'nextjs' if nextjs == 'yes' else 'no-nextjs'}/{cache}"
+            spec = {"jobs": args.jobs, "cache": cache, "template": args.template and os.path.abspath(args.template), "answers": scenario_answers(deploy, packages, nextjs == "yes", args.profile)}
+            for repeat in range(-1 if cache == "warm" else 0, args.repeat):
+                cache_dir = warm_cache if cache == "warm" else os.path.join(bench_dir, f"cache-{len(runs)}-{repeat}")
+                env = bench_env(stub_dir, args.wheelhouse, cache_dir)
+                env["BENCH_NODE_MODULES_FILES"] = str(args.node_modules_files)
+                work_dir = tempfile.mkdtemp(prefix="run-", dir=bench_dir)
+                result = run_scenario({**spec, "name": "project"}, env, work_dir, log_path)
+                if not args.keep:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+                    if cache != "warm":
+                        shutil.rmtree(cache_dir, ignore_errors=True)
+                status = "ok" if result["ok"] else "FAILED"
+                label = "warm-up" if repeat < 0 else f"run {repeat + 1}/{args.repeat}"
+                print(f"{scenario:<36} {label:<10} {result['total_s'] or 0:>7.2f}s {status}", flush=True)
+                if repeat >= 0:
+                    runs.append({"scenario": scenario, "repeat": repeat, **result})
+    finally:
+        if args.keep:
+            print(f"projects and log kept in {bench_dir}")
+        else:
+            failed = any(not run["ok"] for run in runs)
+            if failed:
+                kept_log = os.path.join(tempfile.gettempdir(), "yadpm-bench.log")
+                shutil.copyfile(log_path, kept_log)
+                print(f"some runs failed, log: {kept_log}")
+            shutil.rmtree(bench_dir, ignore_errors=True)
+
+    results = {
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "options": {key: value for key, value in vars(args).items() if key not in ("worker", "json_path", "compare", "keep")},
+        "runs": runs,
+        "summary": summarise(runs),
+    }
+    previous = None
+    if args.compare:
+        with open(args.compare) as previous_file:
+            previous = json.load(previous_file)
+    print()
+    print_summary(results["summary"], previous)
+    if args.json_path:
+        with open(args.json_path, "w") as json_file:
+            json.dump(results, json_file, indent=2)
+    sys.exit(1 if any(not run["ok"] for run in runs) else 0)
+
+
+if __name__ == "__main__":
+    main()
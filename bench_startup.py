@@ -0,0 +1,118 @@
+"""Startup benchmark for yadpm.
+
+Measures time to first output of a few CLI invocations, from source and from the
+PyInstaller binary built by build.py, and the per-module import time breakdown of
+the source run. Exits with status 1 when a warm run is slower than the budget.
+
+    python bench_startup.py
+    python bench_startup.py --binary release/yadpm --budget-ms 150 --binary-budget-ms 600
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+COMMANDS = [["--help"], ["start-project", "--help"], ["docker-build", "--help"], ["dev", "--help"]]
+
+
+def time_to_first_output(cmd: list[str], env: dict[str, str]) -> float:
+    start = time.perf_counter()
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env) as proc:
+        proc.stdout.read(1)
+        elapsed = time.perf_counter() - start
+        proc.stdout.read()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} exited with {proc.returncode}")
+    return elapsed * 1000
+
+
+def measure(cmd: list[str], runs: int, env: dict[str, str]) -> dict:
+    cold = time_to_first_output(cmd, env)
+    warm = [time_to_first_output(cmd, env) for _ in range(runs)]
+    return {"cold_ms": round(cold, 1), "warm_ms": round(statistics.median(warm), 1), "warm_min_ms": round(min(warm), 1)}
+
+
+def import_breakdown(cmd: list[str], env: dict[str, str], top: int) -> list[dict]:
+    result = subprocess.run([*cmd[:1], "-X", "importtime", *cmd[1:]], capture_output=True, text=True, env=env, check=False)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        # nested imports are indented and already part of their parent's cumulative time
+        if name[1:2] == " ":
+            continue
+        modules.append({"module": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    return sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:top]
+
+
+def source_env(pycache_dir: str) -> dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPYCACHEPREFIX"] = pycache_dir  # empty prefix makes the first run compile everything
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # warm runs have to find the bytecode of the cold one
+    return env
+
+
+def print_table(title: str, rows: dict[str, dict]):
+    print(f"\n{title}")
+    print(f"{'command':<30}{'cold ms':>10}{'warm ms':>10}{'min ms':>10}")
+    for command, row in rows.items():
+        print(f"{command:<30}{row['cold_ms']:>10}{row['warm_ms']:>10}{row['warm_min_ms']:>10}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="warm runs per command")
+    parser.add_argument("--binary", default=str(BASE_DIR / "release" / "yadpm"), help="PyInstaller binary to measure if it exists")
+    parser.add_argument("--budget-ms", type=float, default=200, help="warm time to first output budget for the source run")
+    parser.add_argument("--binary-budget-ms", type=float, default=800, help="warm time to first output budget for the binary")
+    parser.add_argument("--top", type=int, default=10, help="number of modules in the import breakdown")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = parser.parse_args()
+
+    results: dict = {"source": {}, "binary": {}, "imports": [], "failures": []}
+    source_cmd = [sys.executable, str(BASE_DIR / "main.py")]
+    for command in COMMANDS:
+        with tempfile.TemporaryDirectory() as pycache_dir:
+            env = source_env(pycache_dir)
+            results["source"][" ".join(command)] = measure([*source_cmd, *command], args.runs, env)
+            if command == COMMANDS[0]:
+                results["imports"] = import_breakdown([*source_cmd, *command], env, args.top)
+
+    if os.path.exists(args.binary):
+        for command in COMMANDS:
+            results["binary"][" ".join(command)] = measure([args.binary, *command], args.runs, dict(os.environ))
+
+    print_table("source", results["source"])
+    if results["binary"]:
+        print_table("binary", results["binary"])
+    else:
+        print(f"\nbinary: {args.binary} not found, run build.py first")
+
+    print(f"\n{'import (yadpm --help)':<30}{'self ms':>10}{'cumul. ms':>10}")
+    for module in results["imports"]:
+        print(f"{module['module']:<30}{module['self_ms']:>10.1f}{module['cumulative_ms']:>10.1f}")
+
+    for target, budget in (("source", args.budget_ms), ("binary", args.binary_budget_ms)):
+        for command, row in results[target].items():
+            if row["warm_ms"] > budget:
+                results["failures"].append(f"{target} '{command}': {row['warm_ms']} ms > {budget} ms")
+
+    if args.json_path:
+        with open(args.json_path, "w") as file:
+            json.dump(results, file, indent=2)
+
+    for failure in results["failures"]:
+        print(f">> [ERROR] Startup budget exceeded: {failure}", file=sys.stderr)
+    return 1 if results["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Compare the dev runner's file watcher with StatReloader-style polling.
+
+Builds a synthetic Django tree (plus a venv and node_modules that must be
+ignored), then for every backend measures the CPU used while idle and the time
+from a file write to the restart decision.
+
+    python bench_watcher.py [--files 5000] [--idle 10] [--changes 10] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from watcher import InotifyWatcher, KqueueWatcher, PollingWatcher, create_watcher
+
+
+def build_tree(root: str, files: int):
+    per_app = 50
+    for i in range(files):
+        app = os.path.join(root, f"app_{i // per_app}")
+        os.makedirs(app, exist_ok=True)
+        with open(os.path.join(app, f"module_{i % per_app}.py"), "w") as file:
+            file.write(f"VALUE = {i}\n")
+    for ignored in ("venv/lib/site-packages/pkg", "node_modules/pkg", "static", "media"):
+        os.makedirs(os.path.join(root, ignored), exist_ok=True)
+        for i in range(200):
+            with open(os.path.join(root, ignored, f"file_{i}.py"), "w") as file:
+                file.write("")
+
+
+async def measure(watcher, root: str, idle: float, changes: int, debounce: float, interval: float) -> dict:
+    batches = watcher.changes(debounce=debounce, interval=interval)
+    next_batch = asyncio.ensure_future(batches.__anext__())
+
+    cpu = time.process_time()
+    await asyncio.sleep(idle)
+    idle_cpu = time.process_time() - cpu
+
+    latencies = []
+    for i in range(changes):
+        target = os.path.join(root, f"app_{i}", "module_0.py")
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        with open(target, "a") as file:
+            file.write(f"# change {i}\n")
+        await asyncio.wait_for(next_batch, timeout=interval * 3 + debounce + 5)
+        latencies.append((time.perf_counter() - started) * 1000)
+        next_batch = asyncio.ensure_future(batches.__anext__())
+    next_batch.cancel()
+    await batches.aclose()
+
+    return {
+        "backend": type(watcher).__name__,
+        "idle_cpu_pct": round(idle_cpu / idle * 100, 2),
+        "latency_ms_p50": round(statistics.median(latencies), 1) if latencies else None,
+        "latency_ms_max": round(max(latencies), 1) if latencies else None,
+    }
+
+
+async def run(args) -> list[dict]:
+    root = tempfile.mkdtemp(prefix="yadpm-watch-")
+    try:
+        build_tree(root, args.files)
+        candidates = [("polling (StatReloader)", lambda: PollingWatcher(root), 0.0, 1.0)]
+        native = create_watcher(root)
+        if isinstance(native, (InotifyWatcher, KqueueWatcher)):
+            candidates.append(("native", lambda: native, args.debounce, 1.0))
+        else:
+            native.close()
+
+        results = []
+        for label, factory, debounce, interval in candidates:
+            watcher = factory()
+            try:
+                result = await measure(watcher, root, args.idle, args.changes, debounce, interval)
+            finally:
+                watcher.close()
+            result["label"] = label
+            result["debounce_ms"] = debounce * 1000
+            results.append(result)
+        return results
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=5000, help="Python files in the synthetic project")
+    parser.add_argument("--idle", type=float, default=10, help="seconds of idle CPU measurement per backend")
+    parser.add_argument("--changes", type=int, default=10, help="file changes used to measure latency")
+    parser.add_argument("--debounce", type=float, default=0.2, help="debounce of the native watcher, seconds")
+    parser.add_argument("--json", dest="json_path", help="write the results to this file")
+    args = parser.parse_args()
+    args.changes = min(args.changes, max(args.files // 50, 1))
+
+    results = asyncio.run(run(args))
+    print(f"{args.files} files, {args.idle:.0f}s idle, {args.changes} changes")
+    print(f"{'backend':<24}{'idle CPU %':>12}{'p50 ms':>10}{'max ms':>10}{'debounce ms':>13}")
+    for result in results:
+        print(
+            f"{result['label']:<24}{result['idle_cpu_pct']:>12.2f}{result['latency_ms_p50']:>10.1f}"
+            f"{result['latency_ms_max']:>10.1f}{result['debounce_ms']:>13.0f}",
+        )
+    if args.json_path:
+        with open(args.json_path, "w") as file:
+            json.dump({"files": args.files, "idle_s": args.idle, "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
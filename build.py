@@ -27,6 +27,7 @@ def build() -> None:
         "--console",
         f"--distpath={build_path}",
         "--add-data=assets.zip:.",
+        "--add-data=runtime:runtime",
         # "--copy-metadata=cutie",
         # "--recursive-copy-metadata=cutie",
         # "--collect-all=cutie",
@@ -0,0 +1,412 @@
+"""Multi-stage Dockerfiles for generated projects and the BuildKit build driving them.
+
+The Django image builds wheels in a builder stage (pip and apt caches are
+BuildKit cache mounts, so rebuilds only fetch what changed) and installs them
+into a slim runtime without compilers. Projects with a locked wheelhouse
+(``lockfile.py``) build from it with ``--no-index``, nothing is downloaded.
+Projects locked for another platform get a lockfile of their own for the image
+in ``docker/`` (:func:`lock_for_image`). The Next.js image installs with
+``npm ci`` against the lockfile, builds with a cached ``.next/cache`` and ships
+only the ``output: "standalone"`` server.
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+
+import entrypoints
+import lockfile
+
+IGNORE_DIRS = {"venv", ".venv", "node_modules", ".git", ".next", "__pycache__", ".yadpm"}
+DEFAULT_PYTHON_VERSION = "3.12"
+DEFAULT_NODE_VERSION = "22"
+# requirements.txt and wheelhouse/ for the image, next to the ones of the deploy target
+IMAGE_LOCK_DIR = "docker"
+
+DJANGO_DOCKERIGNORE = """venv
+node_modules
+.venv
+**/__pycache__
+**/*.pyc
+.git
+.yadpm
+.env
+db.sqlite3
+static
+media
+"""
+
+NEXTJS_DOCKERIGNORE = """node_modules
+.next
+.git
+.env*.local
+npm-debug.log*
+"""
+
+
+@dataclass
+class ProjectLayout:
+    root: str
+    django_dir: str | None = None
+    nextjs_dir: str | None = None
+    python_version: str = DEFAULT_PYTHON_VERSION
+    node_version: str = DEFAULT_NODE_VERSION
+    has_requirements: bool = False
+    has_gunicorn_conf: bool = False
+    has_gunicorn: bool = False
+    has_whitenoise: bool = False
+    has_public_dir: bool = False
+    # requirements.txt has --hash lines, pip then wants a hash for everything it installs
+    has_hashes: bool = False
+    # folder (relative to django_dir) with a lockfile and wheelhouse the image installs offline,
+    # "." for the one of a docker project, with sdists when something has to be compiled
+    lock_dir: str | None = None
+    wheelhouse_has_sdists: bool = False
+    warnings: list[str] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return re.sub(r"[^a-z0-9._-]+", "-", os.path.basename(os.path.abspath(self.root)).lower()).strip("-") or "app"
+
+
+def _find(root: str, predicate, max_depth: int = 3) -> str | None:
+    root = os.path.abspath(root)
+    for dir_path, dir_names, file_names in os.walk(root):
+        depth = os.path.relpath(dir_path, root).count(os.sep) + (dir_path != root)
+        if predicate(dir_path, file_names):
+            return dir_path
+        dir_names[:] = [] if depth >= max_depth else sorted(name for name in dir_names if name not in IGNORE_DIRS)
+    return None
+
+
+def _is_nextjs(dir_path: str, file_names: list[str]) -> bool:
+    if "package.json" not in file_names:
+        return False
+    try:
+        with open(os.path.join(dir_path, "package.json")) as package_json:
+            package = json.load(package_json)
+    except (OSError, ValueError):
+        return False
+    return "next" in {**package.get("dependencies", {}), **package.get("devDependencies", {})}
+
+
+def _venv_python_version(django_dir: str) -> str | None:
+    try:
+        with open(os.path.join(django_dir, "venv", "pyvenv.cfg")) as pyvenv_cfg:
+            for line in pyvenv_cfg:
+                key, _, value = line.partition("=")
+                if key.strip() in ("version", "version_info"):
+                    return ".".join(value.strip().split(".")[:2])
+    except OSError:
+        pass
+    return None
+
+
+def _image_wheelhouse(directory: str, image: lockfile.Target) -> list[str] | None:
+    """Files of the wheelhouse in ``directory`` when its lockfile can be installed in the image."""
+    requirements = os.path.join(directory, "requirements.txt")
+    wheelhouse = os.path.join(directory, "wheelhouse")
+    if not os.path.isfile(requirements) or not os.path.isdir(wheelhouse):
+        return None
+    with open(requirements) as requirements_txt:
+        content = requirements_txt.read()
+    files = os.listdir(wheelhouse)
+    # a lockfile with hashes installs only from the wheelhouse it was written for, nothing can be added to it
+    if not files or "--hash=" not in content or not re.search(r"^gunicorn\b", content, re.I | re.M):
+        return None
+    # wheels for the machine running yadpm (standalone) fail the hash check in the Linux builder
+    for name in files:
+        if name.endswith(".whl") and not name.endswith("-none-any.whl") and not any(tag in name for tag in image.platforms):
+            return None
+    return files
+
+
+def lock_for_image(layout: ProjectLayout, run) -> bool:
+    """Lock the project's venv for the image in ``<django_dir>/docker``, when its own lockfile does not fit.
+
+    The pins of the venv get gunicorn and uvicorn-worker, resolved by pip with
+    those pins as constraints, and are exported with manylinux wheels, so the
+    image builds offline like the one of a docker project. ``run`` is
+    ``Tracer.run``. Returns ``False`` (with a warning) when the image has to
+    install from PyPI without hashes instead.
+    """
+    if layout.django_dir is None or layout.lock_dir is not None or not layout.has_requirements:
+        return False
+    venv_dir = os.path.join(layout.django_dir, "venv")
+    if not os.path.isdir(venv_dir):
+        layout.warnings.append(f"{venv_dir} is missing, the image installs the requirements from PyPI without hashes")
+        return False
+
+    lock_dir = os.path.join(layout.django_dir, IMAGE_LOCK_DIR)
+    python = os.path.join(venv_dir, "bin", "python")
+    image = lockfile.linux_target(layout.python_version)
+    store = lockfile.WheelStore()
+    pins = lockfile.read_pins(venv_dir)
+    servers = [name for name in entrypoints.DOCKER_SERVER_PACKAGES if lockfile.canonical_name(name) not in {pin.key for pin in pins}]
+    try:
+        if servers:
+            pins = sorted([*pins, *store.resolve(run, python, pins, servers, image)], key=lambda pin: pin.key)
+    except RuntimeError as exc:
+        layout.warnings.append(f"{exc}, the image installs the requirements from PyPI without hashes")
+        return False
+    files = store.export(run, python, pins, image, os.path.join(lock_dir, "wheelhouse"))
+    missing = [str(pin) for pin in pins if pin.key not in files]
+    if missing:
+        layout.warnings.append(f"No files for {', '.join(missing)}, the image installs the requirements from PyPI without hashes")
+        return False
+    with open(os.path.join(lock_dir, "requirements.txt"), "w") as requirements_txt:
+        requirements_txt.write(lockfile.format_lockfile(pins, files))
+    layout.lock_dir = IMAGE_LOCK_DIR
+    layout.wheelhouse_has_sdists = any(path.endswith(lockfile.SDIST_SUFFIXES) for path in files.values())
+    return True
+
+
+def analyse(root: str) -> ProjectLayout:
+    """Find the Django and Next.js parts of a project created by start-project."""
+    layout = ProjectLayout(root=os.path.abspath(root))
+    layout.django_dir = _find(root, lambda _, names: "manage.py" in names)
+    layout.nextjs_dir = _find(root, _is_nextjs)
+
+    if layout.django_dir:
+        layout.python_version = _venv_python_version(layout.django_dir) or DEFAULT_PYTHON_VERSION
+        requirements = os.path.join(layout.django_dir, "requirements.txt")
+        layout.has_requirements = os.path.isfile(requirements)
+        layout.has_gunicorn_conf = os.path.isfile(os.path.join(layout.django_dir, "gunicorn.conf.py"))
+        if layout.has_requirements:
+            with open(requirements) as requirements_txt:
+                lines = [line.strip() for line in requirements_txt]
+            layout.has_gunicorn = any(re.match(r"gunicorn\b", line, re.I) for line in lines)
+            layout.has_whitenoise = any(re.match(r"whitenoise\b", line, re.I) for line in lines)
+            layout.has_hashes = any("--hash=" in line for line in lines)
+            image = lockfile.linux_target(layout.python_version)
+            for lock_dir in (".", IMAGE_LOCK_DIR):
+                files = _image_wheelhouse(os.path.join(layout.django_dir, lock_dir), image)
+                if files is not None:
+                    layout.lock_dir = lock_dir
+                    layout.wheelhouse_has_sdists = any(not name.endswith(".whl") for name in files)
+                    break
+        else:
+            layout.warnings.append(f"{requirements} is missing")
+
+    if layout.nextjs_dir:
+        layout.has_public_dir = os.path.isdir(os.path.join(layout.nextjs_dir, "public"))
+        if not os.path.isfile(os.path.join(layout.nextjs_dir, "package-lock.json")):
+            layout.warnings.append(f"{layout.nextjs_dir} has no package-lock.json, npm ci needs one")
+        with open(os.path.join(layout.nextjs_dir, "package.json")) as package_json:
+            engines = json.load(package_json).get("engines", {}).get("node", "")
+        match = re.search(r"\d+", engines)
+        if match:
+            layout.node_version = match.group(0)
+    return layout
+
+
+def django_dockerfile(layout: ProjectLayout) -> str:
+    offline = layout.lock_dir is not None
+    if offline:
+        requirements = os.path.normpath(os.path.join(layout.lock_dir, "requirements.txt"))
+    elif layout.has_hashes:
+        # hashes of files for another platform, write_dockerfiles writes the pins without them
+        requirements = f"{IMAGE_LOCK_DIR}/requirements.txt"
+    else:
+        requirements = "requirements.txt"
+    # without a lockfile for the image gunicorn is whatever PyPI has
+    extra_packages = "" if layout.has_gunicorn else " gunicorn"
+    # hashed and precompressed static files are built into the image, WhiteNoise serves them
+    collectstatic = "RUN SECRET_KEY=collectstatic python manage.py collectstatic --noinput\n" if layout.has_whitenoise else ""
+    command = '["gunicorn", "-c", "gunicorn.conf.py"]' if layout.has_gunicorn_conf else '["gunicorn", "config.wsgi:application", "--bind", "0.0.0.0:8000"]'
+    build_tools = """RUN rm -f /etc/apt/apt.conf.d/docker-clean
+RUN --mount=type=cache,target=/var/cache/apt,sharing=locked \\
+    --mount=type=cache,target=/var/lib/apt,sharing=locked \\
+    apt-get update && apt-get install -y --no-install-recommends build-essential libpq-dev
+"""
+    if offline:
+        # only sdists in the wheelhouse need a compiler
+        build_tools = build_tools if layout.wheelhouse_has_sdists else ""
+        wheelhouse = os.path.normpath(os.path.join(layout.lock_dir, "wheelhouse"))
+        wheels = f"""# wheels come from the wheelhouse exported for the image, checked against the lockfile hashes
+RUN --mount=type=bind,source={wheelhouse},target=/wheelhouse \\
+    pip wheel --no-index --find-links /wheelhouse --wheel-dir /wheels -r requirements.txt
+"""
+        # the wheelhouses are part of the build context, the image gets the sources without them
+        sources = f"""FROM python:${{PYTHON_VERSION}}-slim AS sources
+COPY . /app
+RUN rm -rf /app/wheelhouse /app/{IMAGE_LOCK_DIR}
+
+"""
+        copy_sources = "COPY --from=sources --chown=django:django /app ."
+    else:
+        wheels = f"""# only this layer depends on requirements.txt, the pip cache survives changes to it
+RUN --mount=type=cache,target=/root/.cache/pip \\
+    pip wheel --wheel-dir /wheels -r requirements.txt{extra_packages}
+"""
+        sources = ""
+        copy_sources = "COPY --chown=django:django . ."
+    return f"""# syntax=docker/dockerfile:1.7
+# generated by yadpm docker-build
+
+ARG PYTHON_VERSION={layout.python_version}
+
+FROM python:${{PYTHON_VERSION}}-slim AS builder
+ENV PIP_DISABLE_PIP_VERSION_CHECK=1
+{build_tools}WORKDIR /build
+COPY {requirements} requirements.txt
+{wheels}
+{sources}FROM python:${{PYTHON_VERSION}}-slim AS runtime
+ENV PYTHONDONTWRITEBYTECODE=1 \\
+    PYTHONUNBUFFERED=1 \\
+    PIP_DISABLE_PIP_VERSION_CHECK=1 \\
+    PATH="/venv/bin:$PATH"
+RUN python -m venv /venv
+RUN --mount=type=bind,from=builder,source=/wheels,target=/wheels \\
+    pip install --no-index --no-cache-dir /wheels/*.whl
+RUN useradd --create-home --uid 1000 django
+WORKDIR /app
+{copy_sources}
+{collectstatic}USER django
+EXPOSE 8000
+CMD {command}
+"""
+
+
+def nextjs_dockerfile(layout: ProjectLayout) -> str:
+    public = "COPY --from=builder --chown=nextjs:nodejs /app/public ./public\n" if layout.has_public_dir else ""
+    return f"""# syntax=docker/dockerfile:1.7
+# generated by yadpm docker-build
+
+ARG NODE_VERSION={layout.node_version}
+
+FROM node:${{NODE_VERSION}}-alpine AS deps
+WORKDIR /app
+COPY package.json package-lock.json ./
+RUN --mount=type=cache,target=/root/.npm \\
+    npm ci --no-audit --no-fund
+
+FROM node:${{NODE_VERSION}}-alpine AS builder
+WORKDIR /app
+ENV NEXT_TELEMETRY_DISABLED=1
+COPY --from=deps /app/node_modules ./node_modules
+COPY . .
+RUN --mount=type=cache,target=/app/.next/cache \\
+    npm run build
+
+FROM node:${{NODE_VERSION}}-alpine AS runtime
+WORKDIR /app
+ENV NODE_ENV=production \\
+    NEXT_TELEMETRY_DISABLED=1 \\
+    PORT=3000 \\
+    HOSTNAME=0.0.0.0
+RUN addgroup -S -g 1001 nodejs && adduser -S -u 1001 -G nodejs nextjs
+{public}COPY --from=builder --chown=nextjs:nodejs /app/.next/standalone ./
+COPY --from=builder --chown=nextjs:nodejs /app/.next/static ./.next/static
+USER nextjs
+EXPOSE 3000
+CMD ["node", "server.js"]
+"""
+
+
+def patch_next_config(nextjs_dir: str) -> bool:
+    """Set ``output: "standalone"`` in next.config, return ``False`` if it could not be done."""
+    for name in ("next.config.ts", "next.config.mjs", "next.config.js"):
+        path = os.path.join(nextjs_dir, name)
+        if os.path.isfile(path):
+            break
+    else:
+        with open(os.path.join(nextjs_dir, "next.config.mjs"), "w") as next_config:
+            next_config.write('/** @type {import(\'next\').NextConfig} */\nconst nextConfig = {\n  output: "standalone",\n};\n\nexport default nextConfig;\n')
+        return True
+
+    with open(path) as next_config:
+        content = next_config.read()
+    if re.search(r"\boutput\s*:", content):
+        return "standalone" in content
+    # on a line of its own, also for an empty `{}`
+    content, count = re.subn(r"(const\s+nextConfig\b[^=]*=\s*\{)[ \t]*\n?", r'\1\n  output: "standalone",\n', content, count=1)
+    if count == 0:
+        return False
+    with open(path, "w") as next_config:
+        next_config.write(content)
+    return True
+
+
+def write_dockerfiles(layout: ProjectLayout) -> list[str]:
+    written = []
+    targets = []
+    if layout.django_dir:
+        if layout.lock_dir is None and layout.has_hashes:
+            # the hashes are of files for another platform, the builder fetches its own
+            os.makedirs(os.path.join(layout.django_dir, IMAGE_LOCK_DIR), exist_ok=True)
+            with open(os.path.join(layout.django_dir, "requirements.txt")) as requirements_txt:
+                content = lockfile.without_hashes(requirements_txt.read())
+            with open(os.path.join(layout.django_dir, IMAGE_LOCK_DIR, "requirements.txt"), "w") as requirements_txt:
+                requirements_txt.write(content)
+        targets.append((layout.django_dir, django_dockerfile(layout), DJANGO_DOCKERIGNORE))
+    if layout.nextjs_dir:
+        if not patch_next_config(layout.nextjs_dir):
+            layout.warnings.append(f'add output: "standalone" to next.config in {layout.nextjs_dir}')
+        targets.append((layout.nextjs_dir, nextjs_dockerfile(layout), NEXTJS_DOCKERIGNORE))
+    for directory, dockerfile, dockerignore in targets:
+        for name, content in (("Dockerfile", dockerfile), (".dockerignore", dockerignore)):
+            path = os.path.join(directory, name)
+            with open(path, "w") as file:
+                file.write(content)
+            written.append(path)
+    return written
+
+
+class DockerBuilder:
+    """Builds the images with BuildKit through python-on-whales.
+
+    ``docker`` is a python-on-whales client (or anything with ``buildx.build``),
+    by default the global ``python_on_whales.docker``. With ``cache_registry``
+    layers are cached in ``<cache_registry>/<image>:buildcache`` (all stages,
+    needs a docker-container builder), otherwise the image carries an inline
+    cache and the previous image is used as the cache source.
+    """
+
+    def __init__(self, docker=None, image_prefix: str | None = None, cache_registry: str | None = None, push: bool = False):
+        self.docker = docker
+        self.image_prefix = image_prefix
+        self.cache_registry = cache_registry.rstrip("/") if cache_registry else None
+        self.push = push
+
+    def images(self, layout: ProjectLayout) -> list[dict]:
+        prefix = self.image_prefix or layout.name
+        images = []
+        if layout.django_dir:
+            images.append({"name": f"{prefix}-django", "context": layout.django_dir})
+        if layout.nextjs_dir:
+            images.append({"name": f"{prefix}-nextjs", "context": layout.nextjs_dir})
+        return images
+
+    def build_options(self, image: dict) -> dict:
+        tag = f"{image['name']}:latest"
+        if self.cache_registry:
+            cache_ref = f"{self.cache_registry}/{os.path.basename(image['name'])}:buildcache"
+            cache_from = {"type": "registry", "ref": cache_ref}
+            cache_to = {"type": "registry", "ref": cache_ref, "mode": "max"}
+        else:
+            cache_from = tag
+            cache_to = {"type": "inline"}
+        return {
+            "context_path": image["context"],
+            "file": os.path.join(image["context"], "Dockerfile"),
+            "tags": [tag],
+            "target": "runtime",
+            "cache_from": cache_from,
+            "cache_to": cache_to,
+            "push": self.push,
+            "load": not self.push,
+        }
+
+    def build(self, layout: ProjectLayout) -> list[str]:
+        if self.docker is None:
+            from python_on_whales import docker
+
+            self.docker = docker
+        tags = []
+        for image in self.images(layout):
+            options = self.build_options(image)
+            self.docker.buildx.build(**options)
+            tags.extend(options["tags"])
+        return tags
@@ -0,0 +1,123 @@
+"""WSGI/ASGI entrypoints written into generated projects.
+
+Every entrypoint builds the Django handler once when the module is imported and
+then runs ``config.warmup``, so the first request does not pay for loading the
+URLconf and the template engines.
+"""
+
+DOCKER_SERVER_PACKAGES = ["gunicorn", "uvicorn-worker"]
+
+WARMUP = '''import os
+
+
+def warmup():
+    """Load what Django otherwise loads lazily on the first request."""
+    if os.environ.get("DJANGO_WARMUP", "1") == "0":
+        return
+
+    from django.template import engines
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns  # imports every urls.py and view module
+    engines.all()  # creates the template engines and their loaders
+'''
+
+WSGI = '''"""
+WSGI config for config project.
+
+The handler is built once at import time and warmed up before the first request.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+application = get_wsgi_application()
+
+from config.warmup import warmup  # noqa: E402
+
+warmup()
+'''
+
+ASGI = '''"""
+ASGI config for config project.
+
+Used for async django-ninja views (gunicorn with uvicorn workers, see gunicorn.conf.py).
+The handler is built once at import time and warmed up before the first request.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+application = get_asgi_application()
+
+from config.warmup import warmup  # noqa: E402
+
+warmup()
+'''
+
+PASSENGER_WSGI = '''import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+# Passenger imports this file once per application process, the handler is
+# built here and reused for every request
+from config.wsgi import application  # noqa: E402, F401
+'''
+
+GUNICORN_CONF = '''# gunicorn -c gunicorn.conf.py
+# DJANGO_SERVER=asgi serves config.asgi with uvicorn workers (async django-ninja views),
+# anything else serves config.wsgi with threaded workers. WEB_CONCURRENCY or
+# GUNICORN_WORKERS set the number of workers, by default it follows the CPUs of the container.
+import math
+import os
+
+
+def available_cores():
+    # the CPUs this container may run on, capped by its cgroup v2 quota ("max" means none)
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            cores = min(cores, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(cores, 1)
+
+
+cores = available_cores()
+asgi = os.environ.get("DJANGO_SERVER", "wsgi") == "asgi"
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+if asgi:
+    wsgi_app = "config.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+    workers = int(os.environ.get("GUNICORN_WORKERS", os.environ.get("WEB_CONCURRENCY", cores)))
+    threads = 1
+else:
+    wsgi_app = "config.wsgi:application"
+    worker_class = "gthread"
+    workers = int(os.environ.get("GUNICORN_WORKERS", os.environ.get("WEB_CONCURRENCY", cores * 2 + 1)))
+    threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# load and warm up the app once in the master, workers are forked from it
+preload_app = True
+keepalive = 5
+timeout = 30
+graceful_timeout = 30
+# recycle workers now and then to keep memory in check
+max_requests = 2000
+max_requests_jitter = 200
+accesslog = "-"
+'''
@@ -0,0 +1,153 @@
+import ctypes
+import ctypes.util
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+FICLONE = 0x40049409  # linux/fs.h
+
+
+def cache_root() -> str:
+    return os.environ.get("YADPM_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "yadpm"))
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False) -> Iterator[None]:
+    """Hold an advisory lock on ``path`` (created if missing) between processes.
+
+    Caches take it ``shared`` to read entries and exclusively to add or remove
+    them. Locks are per open file, so threads of one process exclude each other
+    as well. Where ``fcntl`` is missing it does nothing.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _reflink(src: str, dst: str) -> bool:
+    if sys.platform == "darwin":
+        libc_path = ctypes.util.find_library("c")
+        if libc_path is None:
+            return False
+        libc = ctypes.CDLL(libc_path, use_errno=True)
+        if not hasattr(libc, "clonefile"):
+            return False
+        return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+
+    if sys.platform.startswith("linux"):
+        import fcntl
+
+        try:
+            with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+                fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+        except OSError:
+            if os.path.exists(dst):
+                os.remove(dst)
+            return False
+        shutil.copystat(src, dst)
+        return True
+
+    return False
+
+
+def clone_file(src: str, dst: str, hardlink: bool = True):
+    """Hardlink ``src`` to ``dst``, falling back to a reflink and then to a plain copy."""
+    if hardlink:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    if _reflink(src, dst):
+        return
+    shutil.copy2(src, dst)
+
+
+def copy_tree(
+    src: str,
+    dst: str,
+    hardlink: bool = True,
+    replace: tuple[str, str] | None = None,
+    should_replace: Callable[[str], bool] | None = None,
+) -> int:
+    """Materialize ``src`` into ``dst`` with :func:`clone_file`.
+
+    Files for which ``should_replace(relative_path)`` is true get ``replace[0]``
+    swapped for ``replace[1]`` and are written as new files, symlinks pointing
+    into ``replace[0]`` are pointed at ``replace[1]``. Returns the number of bytes
+    of the source tree.
+    """
+    old, new = (os.fsencode(replace[0]), os.fsencode(replace[1])) if replace else (b"", b"")
+    total = 0
+    os.makedirs(dst, exist_ok=True)
+    shutil.copystat(src, dst)
+    for root, dirs, files in os.walk(src):
+        rel_root = os.path.relpath(root, src)
+        dst_root = dst if rel_root == "." else os.path.join(dst, rel_root)
+        for name in dirs + files:
+            src_path = os.path.join(root, name)
+            dst_path = os.path.join(dst_root, name)
+            rel_path = os.path.normpath(os.path.join(rel_root, name))
+
+            if os.path.islink(src_path):
+                target = os.readlink(src_path)
+                if replace and target.startswith(replace[0]):
+                    target = replace[1] + target[len(replace[0]) :]
+                os.symlink(target, dst_path)
+            elif name in dirs:
+                os.makedirs(dst_path, exist_ok=True)
+                shutil.copystat(src_path, dst_path)
+            elif replace and should_replace is not None and should_replace(rel_path):
+                with open(src_path, "rb") as file:
+                    content = file.read()
+                with open(dst_path, "wb") as file:
+                    file.write(content.replace(old, new))
+                shutil.copystat(src_path, dst_path)
+                total += len(content)
+            else:
+                clone_file(src_path, dst_path, hardlink=hardlink)
+                total += os.path.getsize(src_path)
+    return total
+
+
+def write_atomic(path: str, data: bytes, mode: int = 0o644):
+    """Write ``path`` through a temporary file next to it, readers see the old or the new content."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def dir_size(path: str) -> int:
+    seen: set[tuple[int, int]] = set()
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                stat = os.lstat(os.path.join(root, name))
+            except FileNotFoundError:  # removed by a step running meanwhile
+                continue
+            if (stat.st_dev, stat.st_ino) in seen:
+                continue
+            seen.add((stat.st_dev, stat.st_ino))
+            total += stat.st_size
+    return total
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable
+
+JOURNAL_PATH = os.path.join(".yadpm", "journal.json")
+
+
+def fingerprint(paths: list[str], root: str | None = None) -> str:
+    """Hash of the names, sizes and modification times of ``paths`` and everything below them.
+
+    Paths are hashed relative to ``root``, a moved project keeps its fingerprints.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update((os.path.relpath(path, root) if root else path).encode())
+        if not os.path.lexists(path):
+            digest.update(b"\0missing")
+            continue
+        entries = [path]
+        if os.path.isdir(path) and not os.path.islink(path):
+            for dir_path, dirs, files in os.walk(path):
+                dirs.sort()
+                entries.extend(os.path.join(dir_path, name) for name in sorted(dirs + files))
+        for entry in entries:
+            stat = os.lstat(entry)
+            digest.update(f"{os.path.relpath(entry, path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def inputs_hash(inputs: dict) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class StepJournal:
+    """Completed steps of a project, stored in ``<project>/.yadpm/journal.json``.
+
+    Every entry keeps a hash of the step inputs and a fingerprint of its outputs.
+    A step counts as done only while both still match, so a resumed run redoes
+    steps whose files were removed in the meantime. Outputs are the files a step
+    owns and nobody edits afterwards (never settings.py). ``answers`` and
+    ``state`` hold what is needed to continue without asking the questions again.
+    """
+
+    def __init__(self, project_dir: str, state: Callable[[], dict] | None = None):
+        self.project_dir = project_dir
+        self.path = os.path.join(project_dir, JOURNAL_PATH)
+        self.state_getter = state
+        self.data: dict = {"answers": {}, "state": {}, "steps": {}}
+        self._lock = threading.RLock()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> "StepJournal":
+        with open(self.path) as file:
+            self.data = json.load(file)
+        return self
+
+    def save(self):
+        with self._lock:
+            if self.state_getter is not None:
+                self.data["state"] = self.state_getter()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as file:
+                json.dump(self.data, file, indent=2)
+            os.replace(temp_path, self.path)
+
+    @property
+    def answers(self) -> dict:
+        return self.data["answers"]
+
+    @property
+    def state(self) -> dict:
+        return self.data["state"]
+
+    def has(self, name: str) -> bool:
+        return name in self.data["steps"]
+
+    def is_done(self, name: str, inputs: dict, outputs: list[str]) -> bool:
+        entry = self.data["steps"].get(name)
+        if entry is None:
+            return False
+        return entry["inputs"] == inputs_hash(inputs) and entry["outputs"] == fingerprint(outputs, self.project_dir)
+
+    def finished_with(self, name: str, inputs: dict) -> bool:
+        """The step finished with these inputs, whatever happened to its files since."""
+        entry = self.data["steps"].get(name)
+        return entry is not None and entry["inputs"] == inputs_hash(inputs)
+
+    def record(self, name: str, inputs: dict, outputs: list[str]):
+        with self._lock:
+            self.data["steps"][name] = {"inputs": inputs_hash(inputs), "outputs": fingerprint(outputs, self.project_dir), "finished": time.time()}
+
+    def refresh(self, name: str, outputs: list[str]):
+        # later steps edit files of earlier ones (e.g. settings.py), that is not a reason to redo them
+        with self._lock:
+            if name in self.data["steps"]:
+                self.data["steps"][name]["outputs"] = fingerprint(outputs, self.project_dir)
+
+    def forget(self, name: str):
+        with self._lock:
+            self.data["steps"].pop(name, None)
@@ -0,0 +1,304 @@
+"""Pinned requirements with hashes, and the wheelhouse they install from offline.
+
+Pins are read in-process from the metadata of the packages installed in the
+project's venv (``importlib.metadata`` on its site-packages, no ``pip freeze``).
+The wheelhouse holds exactly one file per pin for the deploy target: the
+machine running yadpm, a Docker image (manylinux wheels) or a host PyPI has no
+wheels for (sdists of the compiled packages). Files are kept in a store shared
+by all projects, ``<cache>/wheels/<bucket>``, and hardlinked into the project,
+so a package is fetched once per target. The lockfile hashes are the hashes of
+those files, ``pip install --no-index --find-links wheelhouse -r
+requirements.txt`` installs exactly them.
+"""
+
+import glob
+import hashlib
+import importlib.metadata
+import os
+import platform
+import re
+import shutil
+import sys
+import tempfile
+from dataclasses import dataclass
+
+from fs_utils import cache_root, clone_file, file_lock
+
+# installers, pip freeze leaves them out as well
+SKIPPED = {"pip", "setuptools", "wheel", "distribute"}
+# build backend wheels sdists need, pip wheel --no-index takes them from the wheelhouse
+BUILD_REQUIREMENTS = ["setuptools", "wheel"]
+SDIST_SUFFIXES = (".tar.gz", ".zip")
+# python:<version>-slim is Debian bookworm, glibc 2.36
+GLIBC_MINOR = 36
+
+
+def canonical_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+@dataclass(frozen=True)
+class Pin:
+    name: str
+    version: str
+    # installed from a py3-none-any wheel, the same file works on every platform
+    pure: bool
+
+    @property
+    def key(self) -> str:
+        return canonical_name(self.name)
+
+    def __str__(self) -> str:
+        return f"{self.name}=={self.version}"
+
+
+@dataclass(frozen=True)
+class Target:
+    """Where the wheelhouse is installed, ``platforms`` are pip ``--platform`` tags.
+
+    Without platforms the wheels are built for this machine. ``sdist`` targets
+    get sources for everything that is not pure Python.
+    """
+
+    name: str
+    python_version: str
+    platforms: tuple[str, ...] = ()
+    sdist: bool = False
+
+    @property
+    def bucket(self) -> str:
+        return f"{self.name}-cp{self.python_version.replace('.', '')}"
+
+
+def local_target(python_version: str) -> Target:
+    return Target(f"{sys.platform}-{platform.machine().lower()}", python_version)
+
+
+def linux_target(python_version: str, machine: str | None = None) -> Target:
+    """manylinux wheels for a python:<version>-slim image on this machine's architecture."""
+    machine = (machine or platform.machine()).lower()
+    arch = {"arm64": "aarch64", "amd64": "x86_64"}.get(machine, machine)
+    # pip matches --platform tags exactly, older manylinux versions run on newer glibc
+    platforms = [f"manylinux_2_{minor}_{arch}" for minor in range(GLIBC_MINOR, 16, -1)]
+    platforms.append(f"manylinux2014_{arch}")
+    return Target(f"linux-{arch}", python_version, tuple(platforms))
+
+
+def sdist_target(python_version: str) -> Target:
+    return Target("sdist", python_version, sdist=True)
+
+
+def site_packages(venv_dir: str) -> str:
+    candidates = glob.glob(os.path.join(venv_dir, "lib", "python*", "site-packages")) or glob.glob(os.path.join(venv_dir, "Lib", "site-packages"))
+    if not candidates:
+        raise FileNotFoundError(f"No site-packages in {venv_dir}")
+    return candidates[0]
+
+
+def venv_python_version(venv_dir: str) -> str:
+    match = re.search(r"python(\d+\.\d+)", site_packages(venv_dir))
+    return match.group(1) if match else ".".join(platform.python_version_tuple()[:2])
+
+
+def read_pins(venv_dir: str) -> list[Pin]:
+    """Every distribution installed in the venv, without the installers."""
+    pins = {}
+    for dist in importlib.metadata.distributions(path=[site_packages(venv_dir)]):
+        name = dist.metadata["Name"]
+        if not name or canonical_name(name) in SKIPPED:
+            continue
+        wheel = dist.read_text("WHEEL") or ""
+        tags = re.findall(r"^Tag:\s*(\S+)", wheel, re.M)
+        pure = bool(tags) and all(tag.endswith("-none-any") for tag in tags)
+        pins[canonical_name(name)] = Pin(name, dist.version, pure)
+    return sorted(pins.values(), key=lambda pin: pin.key)
+
+
+def _split_filename(file_name: str) -> tuple[str, str] | None:
+    if file_name.endswith(".whl"):
+        parts = file_name[: -len(".whl")].split("-")
+        return (canonical_name(parts[0]), parts[1]) if len(parts) >= 5 else None
+    for suffix in SDIST_SUFFIXES:
+        if file_name.endswith(suffix):
+            name, _, version = file_name[: -len(suffix)].rpartition("-")
+            return (canonical_name(name), version) if name else None
+    return None
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class WheelStore:
+    """Wheels and sdists downloaded for any project, by bucket.
+
+    ``any`` holds pure wheels and ``sdist`` sources, both usable everywhere, the
+    other buckets wheels for one platform and Python version.
+    """
+
+    def __init__(self, root: str | None = None):
+        self.root = root or os.path.join(cache_root(), "wheels")
+
+    def _files(self, bucket: str) -> dict[tuple[str, str], str]:
+        directory = os.path.join(self.root, bucket)
+        files = {}
+        for file_name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            split = _split_filename(file_name)
+            if split is not None:
+                files[split] = os.path.join(directory, file_name)
+        return files
+
+    def _buckets(self, pin: Pin, target: Target) -> list[str]:
+        if pin.pure:
+            return ["any", "sdist"]
+        return ["sdist"] if target.sdist else [target.bucket]
+
+    def find(self, pin: Pin, target: Target) -> str | None:
+        for bucket in self._buckets(pin, target):
+            path = self._files(bucket).get((pin.key, pin.version))
+            if path is not None:
+                return path
+        return None
+
+    def find_latest(self, name: str) -> str | None:
+        # build requirements are not pinned, any version in the store does
+        matches = [path for (key, _), path in self._files("any").items() if key == canonical_name(name)]
+        return matches[-1] if matches else None
+
+    def _fetch(self, run, args: list[str], target: Target, fetched: list[str] | None = None) -> int:
+        """Run a pip command writing into a temporary folder, then file the results by bucket.
+
+        The names of the files are added to ``fetched``.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=self.root)
+        try:
+            code = run([arg.replace("{dest}", temp_dir) for arg in args])[0]
+            for file_name in os.listdir(temp_dir):
+                if fetched is not None:
+                    fetched.append(file_name)
+                if file_name.endswith("-none-any.whl"):
+                    bucket = "any"
+                elif file_name.endswith(".whl"):
+                    bucket = target.bucket
+                else:
+                    bucket = "sdist"
+                os.makedirs(os.path.join(self.root, bucket), exist_ok=True)
+                os.replace(os.path.join(temp_dir, file_name), os.path.join(self.root, bucket, file_name))
+            return code
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _download_binary(self, run, python: str, pins: list[Pin], target: Target) -> list[Pin]:
+        args = [python, "-m", "pip", "download", "--no-deps", "--only-binary=:all:", "--dest", "{dest}"]
+        args += ["--implementation", "cp", "--python-version", target.python_version]
+        for platform_tag in target.platforms:
+            args += ["--platform", platform_tag]
+        if self._fetch(run, [*args, *map(str, pins)], target) != 0 and len(pins) > 1:
+            # one package without a wheel fails the whole download, the others still have one
+            for pin in pins:
+                if self.find(pin, target) is None:
+                    self._fetch(run, [*args, str(pin)], target)
+        return [pin for pin in pins if self.find(pin, target) is None]
+
+    def resolve(self, run, python: str, pins: list[Pin], requirements: list[str], target: Target) -> list[Pin]:
+        """Pins for ``requirements`` and the packages they need beyond ``pins``, resolved by pip for ``target``.
+
+        ``pins`` are constraints, a dependency already pinned keeps its version.
+        The files pip downloads stay in the store for the export.
+        """
+        args = [python, "-m", "pip", "download", "--only-binary=:all:", "--dest", "{dest}"]
+        if target.platforms:
+            args += ["--implementation", "cp", "--python-version", target.python_version]
+            for platform_tag in target.platforms:
+                args += ["--platform", platform_tag]
+        fetched = []
+        with tempfile.TemporaryDirectory() as temp_dir:
+            constraints = os.path.join(temp_dir, "constraints.txt")
+            with open(constraints, "w") as constraints_txt:
+                constraints_txt.write("".join(f"{pin}\n" for pin in pins))
+            with file_lock(os.path.join(self.root, ".lock")):
+                code = self._fetch(run, [*args, "-c", constraints, *requirements], target, fetched)
+        if code != 0:
+            raise RuntimeError(f"pip cannot resolve {', '.join(requirements)} for {target.name}")
+
+        pinned = {pin.key for pin in pins}
+        added = {}
+        for file_name in fetched:
+            split = _split_filename(file_name)
+            if split is not None and split[0] not in pinned:
+                added[split[0]] = Pin(file_name.split("-")[0], split[1], file_name.endswith("-none-any.whl"))
+        return sorted(added.values(), key=lambda pin: pin.key)
+
+    def export(self, run, python: str, pins: list[Pin], target: Target, dest: str) -> dict[str, str]:
+        """Fill ``dest`` with one file per pin for ``target``, fetching what the store lacks.
+
+        ``run`` is ``Tracer.run`` and ``python`` the venv's interpreter, pip is
+        taken from there. Returns pin keys mapped to the files in ``dest``, pins
+        nothing was found for are left out. Exports run one at a time per store,
+        a package several projects lack is fetched by the first of them.
+        """
+        with file_lock(os.path.join(self.root, ".lock")):
+            files, build_files = self._collect(run, python, pins, target)
+
+        shutil.rmtree(dest, ignore_errors=True)
+        os.makedirs(dest)
+        exported = {}
+        for key, path in files.items():
+            exported[key] = os.path.join(dest, os.path.basename(path))
+            clone_file(path, exported[key])
+        for path in build_files:
+            clone_file(path, os.path.join(dest, os.path.basename(path)))
+        return exported
+
+    def _collect(self, run, python: str, pins: list[Pin], target: Target) -> tuple[dict[str, str], list[str]]:
+        build_here = [pin for pin in pins if (pin.pure or not (target.platforms or target.sdist)) and self.find(pin, target) is None]
+        if build_here:
+            # pure wheels are the same everywhere, pip wheel reuses the downloads of the install
+            self._fetch(run, [python, "-m", "pip", "wheel", "--no-deps", "--wheel-dir", "{dest}", *map(str, build_here)], target)
+
+        foreign = [pin for pin in pins if not pin.pure and self.find(pin, target) is None]
+        if foreign and target.platforms:
+            foreign = self._download_binary(run, python, foreign, target)
+        if foreign:
+            self._fetch(run, [python, "-m", "pip", "download", "--no-deps", "--no-binary=:all:", "--dest", "{dest}", *map(str, foreign)], target)
+
+        files = {}
+        for pin in pins:
+            # compiled packages without a wheel for the target are built from source there
+            path = self.find(pin, target) or self._files("sdist").get((pin.key, pin.version))
+            if path is not None:
+                files[pin.key] = path
+
+        needs_build = any(path.endswith(SDIST_SUFFIXES) for path in files.values())
+        build_files = []
+        if needs_build:
+            if any(self.find_latest(name) is None for name in BUILD_REQUIREMENTS):
+                self._fetch(run, [python, "-m", "pip", "download", "--no-deps", "--only-binary=:all:", "--dest", "{dest}", *BUILD_REQUIREMENTS], target)
+            build_files = [path for path in map(self.find_latest, BUILD_REQUIREMENTS) if path is not None]
+        return files, build_files
+
+
+def format_lockfile(pins: list[Pin], files: dict[str, str] | None = None) -> str:
+    """requirements.txt content, with hashes when every pin has a file (pip takes all or none)."""
+    with_hashes = bool(files) and all(pin.key in files for pin in pins)
+    lines = ["# pinned by yadpm from the packages installed in venv"]
+    if with_hashes:
+        lines.append("# offline install: pip install --no-index --find-links wheelhouse -r requirements.txt")
+    for pin in pins:
+        if with_hashes:
+            lines.append(f"{pin} \\\n    --hash=sha256:{file_hash(files[pin.key])}")
+        else:
+            lines.append(str(pin))
+    return "\n".join(lines) + "\n"
+
+
+def without_hashes(content: str) -> str:
+    """requirements.txt ``content`` with the ``--hash`` options taken out, the pins stay."""
+    content = re.sub(r"^# offline install: .*\n", "", content, flags=re.M)
+    content = re.sub(r"[ \t]*\\\n[ \t]*--hash=\S+", "", content)
+    return re.sub(r"[ \t]+--hash=\S+", "", content)
@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import tempfile
+
+from fs_utils import cache_root, copy_tree, file_lock
+
+
+class NextjsTemplateCache:
+    """Generated Next.js skeletons, kept per Next.js version.
+
+    ``<cache>/nextjs/<version>/skeleton`` holds the project files and lockfile
+    produced by create-next-app, ``<cache>/nextjs/<version>/node_modules`` the
+    installed packages. New projects get a copy of the skeleton and a hardlinked
+    node_modules, so the packages are stored once for all projects. ``current``
+    names the version used for new projects.
+    """
+
+    def __init__(self, root: str | None = None):
+        self.root = root or os.path.join(cache_root(), "nextjs")
+
+    @property
+    def version(self) -> str | None:
+        try:
+            with open(os.path.join(self.root, "current")) as current:
+                version = current.read().strip()
+        except OSError:
+            return None
+        return version if os.path.isdir(os.path.join(self.root, version, "skeleton")) else None
+
+    def _lock(self, shared: bool = False):
+        return file_lock(os.path.join(self.root, ".lock"), shared=shared)
+
+    def populate(self, run, env: dict[str, str] | None = None, refresh: bool = False) -> str | None:
+        """Generate a fresh skeleton with create-next-app@latest, ``run`` is ``Tracer.run``.
+
+        Unless ``refresh``, a skeleton another process generated while this one
+        waited for the lock is used as it is.
+        """
+        with self._lock():
+            if not refresh and self.version is not None:
+                return self.version
+            return self._populate(run, env)
+
+    def _populate(self, run, env: dict[str, str] | None) -> str | None:
+        os.makedirs(self.root, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=self.root)
+        try:
+            code, _ = run(["npx", "--yes", "create-next-app@latest", "skeleton", "--yes", "--use-npm", "--disable-git"], cwd=temp_dir, env=env)
+            skeleton = os.path.join(temp_dir, "skeleton")
+            if code != 0 or not os.path.isfile(os.path.join(skeleton, "package-lock.json")):
+                return None
+
+            with open(os.path.join(skeleton, "node_modules", "next", "package.json")) as package_json:
+                version = json.load(package_json)["version"]
+
+            target = os.path.join(self.root, version)
+            shutil.rmtree(target, ignore_errors=True)
+            os.makedirs(target)
+            shutil.rmtree(os.path.join(skeleton, ".git"), ignore_errors=True)
+            shutil.move(os.path.join(skeleton, "node_modules"), os.path.join(target, "node_modules"))
+            shutil.move(skeleton, os.path.join(target, "skeleton"))
+
+            with open(os.path.join(self.root, "current.tmp"), "w") as current:
+                current.write(version)
+            os.replace(os.path.join(self.root, "current.tmp"), os.path.join(self.root, "current"))
+            return version
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def materialize(self, project_dir: str, name: str) -> bool:
+        with self._lock(shared=True):
+            version = self.version
+            if version is None:
+                return False
+            entry = os.path.join(self.root, version)
+            # source files are copied (or reflinked) so edits never reach the cache, packages are hardlinked
+            copy_tree(os.path.join(entry, "skeleton"), project_dir, hardlink=False)
+            copy_tree(os.path.join(entry, "node_modules"), os.path.join(project_dir, "node_modules"))
+
+        for file_name in ("package.json", "package-lock.json"):
+            path = os.path.join(project_dir, file_name)
+            with open(path) as file:
+                content = json.load(file)
+            content["name"] = name
+            if "" in content.get("packages", {}):
+                content["packages"][""]["name"] = name
+            with open(path, "w") as file:
+                json.dump(content, file, indent=2)
+                file.write("\n")
+        return True
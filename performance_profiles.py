@@ -0,0 +1,121 @@
+"""Performance profiles appended to the generated settings.py.
+
+``none`` leaves Django defaults, ``default`` keeps everything in process
+(local-memory cache), ``redis`` uses a Redis cache shared by all workers.
+"""
+
+PROFILES = {
+    "none": "Django defaults",
+    "default": "Persistent DB connections, local-memory cache, cached sessions and templates",
+    "redis": "Like default, with a Redis cache shared by all workers",
+}
+PROFILE_PACKAGES = {"redis": ["redis"]}
+
+DATABASE = """
+# performance profile: database
+# keep connections open between requests instead of reconnecting every time, except under ASGI:
+# async views run each request in a new thread, persistent connections would pile up there
+DATABASES["default"]["CONN_MAX_AGE"] = config(
+    "DB_CONN_MAX_AGE", default=0 if config("DJANGO_SERVER", default="wsgi") == "asgi" else 600, cast=int
+)
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # WAL lets readers and a writer work at the same time, synchronous=NORMAL is safe with WAL
+    DATABASES["default"].setdefault("OPTIONS", {}).update(
+        {
+            "init_command": (
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=NORMAL;"
+                "PRAGMA busy_timeout=5000;"
+                "PRAGMA temp_store=MEMORY;"
+                "PRAGMA mmap_size=134217728;"
+                "PRAGMA cache_size=-20000;"
+            ),
+            "transaction_mode": "IMMEDIATE",
+        },
+    )
+"""
+
+LOCMEM_CACHE = """
+# performance profile: cache
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "default",
+    },
+}
+"""
+
+REDIS_CACHE = """
+# performance profile: cache
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config("REDIS_URL", default="redis://127.0.0.1:6379/1"),
+    },
+}
+"""
+
+SESSIONS_AND_TEMPLATES = """
+# performance profile: sessions and templates
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+TEMPLATES[0]["APP_DIRS"] = False
+TEMPLATES[0]["OPTIONS"]["loaders"] = [
+    (
+        "django.template.loaders.cached.Loader",
+        [
+            "django.template.loaders.filesystem.Loader",
+            "django.template.loaders.app_directories.Loader",
+        ],
+    ),
+]
+"""
+
+TESTS = '''from decouple import config
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.template import engines
+from django.test import TestCase
+
+
+class PerformanceProfileTests(TestCase):
+    """Run with: venv/bin/python manage.py test config"""
+
+    def test_persistent_connections(self):
+        if config("DJANGO_SERVER", default="wsgi") == "asgi":
+            self.assertEqual(connection.settings_dict["CONN_MAX_AGE"], 0)
+        else:
+            self.assertGreater(connection.settings_dict["CONN_MAX_AGE"], 0)
+        self.assertTrue(connection.settings_dict["CONN_HEALTH_CHECKS"])
+
+    def test_sqlite_pragmas(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("not using SQLite")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def test_cache_is_active(self):
+        self.assertNotEqual(settings.CACHES["default"]["BACKEND"], "django.core.cache.backends.dummy.DummyCache")
+        cache.set("performance-profile-test", "ok", 10)
+        self.assertEqual(cache.get("performance-profile-test"), "ok")
+        cache.delete("performance-profile-test")
+
+    def test_cached_sessions(self):
+        self.assertEqual(settings.SESSION_ENGINE, "django.contrib.sessions.backends.cached_db")
+
+    def test_cached_template_loader(self):
+        loaders = engines["django"].engine.template_loaders
+        self.assertEqual(loaders[0].__module__, "django.template.loaders.cached")
+'''
+
+
+def settings_blocks(profile: str) -> list[str]:
+    """Blocks appended to settings.py, each starting with its own ``# performance profile:`` line."""
+    if profile == "none":
+        return []
+    cache = REDIS_CACHE if profile == "redis" else LOCMEM_CACHE
+    return [DATABASE, cache, SESSIONS_AND_TEMPLATES]
@@ -0,0 +1,872 @@
+import ast
+import json
+import os
+import re
+import shlex
+import shutil
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+import click
+from dotenv import dotenv_values, set_key
+from InquirerPy import get_style, inquirer
+from InquirerPy.base.control import Choice
+
+import docker_build
+import entrypoints
+import lockfile
+import performance_profiles
+import settings_defaults
+import static_pipeline
+from asset_provider import AssetProvider
+from journal import StepJournal
+from nextjs_cache import NextjsTemplateCache
+from scheduler import StepScheduler
+from template_store import TemplateStore
+from tracing import Tracer
+from venv_cache import VenvCache, python_version
+
+
+def merge_list(content: str, name: str, items: list[str]) -> str:
+    """``name = [...]`` in ``content`` holding ``items`` in this order, other entries kept after them.
+
+    One entry per line like startproject writes them, entries are compared by value
+    so '' and "" quotes are the same entry.
+    """
+    match = re.search(rf"({name} = \[)([\s\S]*?)(\])", content)
+    if match is None:
+        return content
+    current = [line.strip().rstrip(",") for line in match.group(2).splitlines() if line.strip() and not line.strip().startswith("#")]
+    keys = [_entry_key(item) for item in items]
+    merged = [*items, *(item for item in current if _entry_key(item) not in keys)]
+    if [_entry_key(item) for item in merged] == [_entry_key(item) for item in current]:
+        return content
+    body = "\n".join(f"    {item}," for item in merged)
+    return content[: match.start(2)] + f"\n{body}\n" + content[match.end(2) :]
+
+
+def _entry_key(item: str):
+    try:
+        return ast.literal_eval(item)
+    except (ValueError, SyntaxError):
+        return item
+
+
+def append_block(content: str, block: str) -> str:
+    """``content`` with ``block`` appended, unless its first line (a ``# ...`` header) is there already."""
+    header = block.strip().splitlines()[0]
+    return content if header in content else content + block
+
+
+class DjangoProjectManager:
+    # console: Console
+    BASE_DIR: str
+    PROJECT_NAME: str
+    PROJECT_DIR: str
+    TEMP_DIR: str
+    ASSETS_ZIP: str
+    RUNTIME_DIR: str
+    DJANGO_DIR: str
+    VENV_DIR: str
+    SETTINGS_PATH: str
+    URLS_PATH: str
+    NEXTJS_DIR: str
+    # django libs
+    include_ninja: bool
+    include_rest_auth: bool
+    include_postgres_sql: bool
+    include_static_pipeline: bool
+    # nextjs
+    create_next_js: bool
+    nextjs_project_name: str | None
+    # deploy
+    deploy_option: str
+    performance_profile: str
+    # admin
+    superuser: dict[str, str]
+
+    to_install = ["django", "python-decouple"]
+    deploy_options = ["mydevil", "docker", "standalone"]
+    # optional packages offered by select_python_packages, the first three are preselected
+    package_choices = {
+        "django-ninja": "Django Ninja",
+        "djangorestframework": "Rest Auth",
+        "django-cors-headers": "Cors Headers",
+        "users": "Custom User Model",
+        "psycopg2": "PostgreSQL",
+        static_pipeline.PACKAGE: "Static files pipeline (WhiteNoise, gzip + brotli)",
+    }
+    default_packages = ["django-ninja", "djangorestframework", "django-cors-headers"]
+    # create-next-app questions, asked up front when it runs without the cache: question, default, flag for yes and no
+    nextjs_questions = {
+        "typescript": ("Use TypeScript?", True, "--ts", "--js"),
+        "eslint": ("Use ESLint?", True, "--eslint", "--no-eslint"),
+        "tailwind": ("Use Tailwind CSS?", True, "--tailwind", "--no-tailwind"),
+        "src_dir": ("Put the code inside a src/ directory?", False, "--src-dir", "--no-src-dir"),
+        "app_router": ("Use App Router?", True, "--app", "--no-app"),
+    }
+    installed_apps = [
+        "django.contrib.admin",
+        "django.contrib.auth",
+        "django.contrib.contenttypes",
+        "django.contrib.sessions",
+        "django.contrib.messages",
+        "django.contrib.staticfiles",
+    ]
+    middleware = settings_defaults.MIDDLEWARE
+    postgresql_db = settings_defaults.POSTGRESQL_DB
+    urlpatterns = [
+        "path('admin/', admin.site.urls)",
+    ]
+
+    def __init__(
+        self,
+        jobs: int | None = None,
+        use_cache: bool = True,
+        profile: str | None = None,
+        resume: bool = False,
+        refresh_nextjs_template: bool = False,
+        npm_registry: str | None = None,
+        template: str | None = None,
+    ):
+        # the class level lists are defaults, every run extends its own copies
+        self.to_install = list(self.to_install)
+        self.installed_apps = list(self.installed_apps)
+        self.middleware = list(self.middleware)
+        self.urlpatterns = list(self.urlpatterns)
+        self.jobs = jobs
+        self.resume = resume
+        self.nextjs_cache = NextjsTemplateCache() if use_cache else None
+        self.nextjs_options = {}
+        self.refresh_nextjs_template = refresh_nextjs_template
+        self.npm_env = {"npm_config_registry": npm_registry} if npm_registry else None
+        self.profile = profile
+        self.tracer = Tracer(enabled=profile is not None)
+        self.venv_cache = VenvCache() if use_cache else None
+        self.venv_from_cache = False
+        self._question_style = get_style({"question": "#7df7fa", "questionmark": "#7df7fa"}, style_override=True)
+
+        # self.console = Console()
+        self.BASE_DIR = Path(sys.argv[0]).resolve().parent
+        self.TEMP_DIR = self.BASE_DIR
+        if hasattr(sys, "_MEIPASS"):
+            self.TEMP_DIR = sys._MEIPASS  # noqa: SLF001
+        self.ASSETS_ZIP = os.path.join(self.TEMP_DIR, "assets.zip")
+        self.assets = AssetProvider(self.ASSETS_ZIP)
+        self.template_store = TemplateStore()
+        # a relative path has to keep working for --resume started from another folder
+        self.template = os.path.abspath(template) if template and os.path.exists(template) else template
+        self.templates = None
+        self.RUNTIME_DIR = os.path.join(self.TEMP_DIR, "runtime")
+
+    def __check_project_dir(self):
+        if os.path.exists(self.PROJECT_DIR):
+            if self.PROJECT_NAME == "." and len(os.listdir(self.PROJECT_DIR)) > 0:
+                click.echo(click.style(f">> [ERROR] Folder '{self.PROJECT_DIR}' is not empty", fg="red"))
+                sys.exit(1)
+
+            if click.confirm(click.style(f">> [WARNING] Found folder '{self.PROJECT_NAME}' in directory, delete?", fg="yellow"), default=True):
+                shutil.rmtree(self.PROJECT_DIR)
+            else:
+                click.echo(click.style("Aborted!", fg="red"), default=True)
+                sys.exit(1)
+        click.echo(f">> [INFO] Project directory -> {self.PROJECT_DIR}")
+
+    def set_project_name(self):
+        self.PROJECT_NAME = click.prompt(click.style("Enter project name", fg="cyan"), default=".")
+        if self.PROJECT_NAME == ".":
+            self.PROJECT_DIR = self.BASE_DIR
+        else:
+            self.PROJECT_DIR = os.path.join(self.BASE_DIR, self.PROJECT_NAME)
+        self.journal = StepJournal(self.PROJECT_DIR, state=self.journal_state)
+
+        if self.resume:
+            if not self.journal.exists():
+                click.echo(click.style(f">> [ERROR] Nothing to resume in '{self.PROJECT_DIR}'", fg="red"), color=True, err=True)
+                sys.exit(1)
+            click.echo(f">> [INFO] Resuming project -> {self.PROJECT_DIR}")
+            self.journal.load()
+            return
+
+        self.__check_project_dir()
+        os.mkdir(self.PROJECT_DIR)
+
+    def __pip_install(self, libs: str):
+        pip = f"{self.VENV_DIR}/bin/pip"
+        return self.tracer.run([pip, "install", *libs.split()])[0]
+
+    def __django_admin(self, args: str) -> int:
+        django_admin = f"{self.VENV_DIR}/bin/django-admin"
+        click.echo(self.DJANGO_DIR)
+        click.echo(django_admin)
+        return self.tracer.run([django_admin, *shlex.split(args)], cwd=self.DJANGO_DIR)[0]
+
+    @property
+    def python_packages(self) -> list[str]:
+        # "users" selects the bundled custom user module, not a package from PyPI
+        return [lib for lib in self.to_install if lib != "users"]
+
+    def __venv_cache_key(self) -> str:
+        return VenvCache.key(python_version("python3"), self.python_packages)
+
+    def __install_libraries(self):
+        if self.venv_from_cache:
+            click.echo(">> [INFO] Libraries already installed in cached virtual environment")
+            return
+
+        install_string = " ".join(self.python_packages)
+        click.echo(f">> [INFO] Installing libraries: {install_string}")
+        if self.__pip_install(install_string) != 0:
+            click.echo(click.style(">> [ERROR] Libraries cannot be installed", fg="red"), color=True, err=True)
+            sys.exit(1)
+
+        click.echo(click.style(">> [RESULT] Libraries installed successfully", fg="green"), color=True)
+        if self.venv_cache is not None:
+            click.echo(">> [INFO] Storing virtual environment in cache")
+            self.venv_cache.store(self.__venv_cache_key(), self.VENV_DIR, self.python_packages)
+
+    def start_django_project(self):
+        click.echo(">> [INFO] Creating new Django project")
+        if os.path.exists(os.path.join(self.DJANGO_DIR, "config")):
+            self.__restore_django_project()
+        elif self.__django_admin(args="startproject config .") != 0:
+            click.echo(click.style(">> [ERROR] Django project cannot be created", fg="red"), color=True, err=True)
+            sys.exit(1)
+        if self.include_custom_user and not os.path.exists(os.path.join(self.DJANGO_DIR, "users")):
+            self.__add_custom_user()
+
+        click.echo(click.style(">> [RESULT] Django project successfully created", fg="green"), color=True)
+
+    def __restore_django_project(self):
+        # run again after some of its files were removed, the missing ones are written and edited ones kept
+        with tempfile.TemporaryDirectory() as fresh:
+            if self.__django_admin(args=f"startproject config {shlex.quote(fresh)}") != 0:
+                click.echo(click.style(">> [ERROR] Django project cannot be created", fg="red"), color=True, err=True)
+                sys.exit(1)
+            for root, _, files in os.walk(fresh):
+                for name in files:
+                    target = os.path.join(self.DJANGO_DIR, os.path.relpath(os.path.join(root, name), fresh))
+                    if not os.path.exists(target):
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        shutil.copy2(os.path.join(root, name), target)
+
+    def start_django_app(self):
+        if click.confirm(click.style("Would you like to start django app?", fg="cyan"), default=True):
+            name = click.prompt(click.style("Enter app name", fg="cyan"))
+            click.echo(f">> [INFO] Creating new django app -> {name}")
+            if self.__django_admin(args=f"startapp {name}") != 0:
+                click.echo(click.style(">> [ERROR] Django app cannot be created", fg="red"), color=True, err=True)
+                sys.exit(1)
+            click.echo(click.style(">> [RESULT] Django app successfully created", fg="green"), color=True)
+
+    def create_venv(self):
+        if self.venv_cache is not None and self.venv_cache.materialize(self.__venv_cache_key(), self.VENV_DIR):
+            self.venv_from_cache = True
+            click.echo(click.style(">> [RESULT] Virtual environment restored from cache", fg="green"), color=True)
+            return
+
+        click.echo(">> [INFO] Creating virtual environment")
+        if self.tracer.run(["python3", "-m", "venv", self.VENV_DIR])[0] != 0:
+            click.echo(click.style(">> [ERROR] Virtual environment cannot be created", fg="red"), color=True, err=True)
+            sys.exit(1)
+        click.echo(click.style(">> [RESULT] Virtual environment created", fg="green"), color=True)
+
+    def __add_custom_user(self):
+        self.templates.materialize(".django_users", os.path.join(self.DJANGO_DIR, "users"))
+
+    def yadpm_command(self) -> list[str]:
+        # the command running this manager, run_dev.sh calls it back for `yadpm dev`
+        if getattr(sys, "frozen", False):
+            return [sys.executable]
+        return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")]
+
+    def load_templates(self):
+        # the built-in pack is installed once per assets.zip, --template files replace its files
+        self.templates = self.template_store.install_zip("builtin", self.assets)
+        if self.template is None:
+            return
+        try:
+            self.templates = self.templates.overlay(self.template_store.resolve(self.template))
+        except (KeyError, ValueError) as exc:
+            click.echo(click.style(f">> [ERROR] {exc.args[0]}", fg="red"), color=True, err=True)
+            sys.exit(1)
+        click.echo(f">> [INFO] Using template {self.templates.name}")
+
+    def template_context(self, quote=lambda value: value) -> dict[str, str]:
+        return {
+            "project_name": quote(os.path.basename(self.PROJECT_DIR)),
+            "django_path": quote(self.DJANGO_DIR),
+            "next_js_path": quote(self.NEXTJS_DIR if self.create_next_js else ""),
+            "yadpm": shlex.join(self.yadpm_command()),
+        }
+
+    def apply_template(self):
+        written = self.templates.materialize("project", self.PROJECT_DIR, context=self.template_context())
+        click.echo(click.style(f">> [RESULT] {len(written)} files added from template {self.templates.name}", fg="green"), color=True)
+
+    def add_run_dev(self):
+        dest_run_dev_path = os.path.join(self.PROJECT_DIR, "run_dev.sh")
+        self.templates.materialize("run_dev.sh", dest_run_dev_path, context=self.template_context(shlex.quote))
+        os.chmod(dest_run_dev_path, 0o755)
+
+    @property
+    def include_users_api(self) -> bool:
+        # users/api.py needs django-ninja for the router and the DRF token model
+        return self.include_custom_user and self.include_ninja and self.include_rest_auth
+
+    def __update_url_file(self):
+        # if self.create_next_js:
+        #     self.urlpatterns.append("path('', include('django_nextjs.urls'))")
+        #     self.urlpatterns.append("re_path(r'^.*', nextjs_page(), name='frontpage')")
+        #     with open(self.URLS_PATH, "r+") as urls:
+        #         content = urls.read()
+        #         urlpatterns_str = "\n".join(f"    {u}," for u in self.urlpatterns)
+        #         content = re.sub(r"(urlpatterns = \[)([\s\S]*?)(\])", rf"\1\n{urlpatterns_str}\n\3", content)
+        #         content = content.replace("from django.urls import path", "from django.urls import path, include, re_path\nfrom django_nextjs.views import nextjs_page\n")
+        #         urls.seek(0)
+        #         urls.write(content)
+        #         urls.truncate()
+        if not self.include_users_api:
+            return
+
+        click.echo(">> [INFO] Adding users API and load test")
+        with open(self.URLS_PATH, "r+") as urls:
+            content = urls.read()
+            content = merge_list(content, "urlpatterns", [*self.urlpatterns, "path('api/', api.urls)"])
+            if "api = NinjaAPI()" not in content:
+                content = content.replace(
+                    "from django.urls import path\n",
+                    'from django.urls import path\nfrom ninja import NinjaAPI\n\napi = NinjaAPI()\napi.add_router("/auth/", "users.api.router")\n',
+                )
+            urls.seek(0)
+            urls.write(content)
+            urls.truncate()
+        shutil.copyfile(os.path.join(self.RUNTIME_DIR, "loadtest.py"), os.path.join(self.DJANGO_DIR, "loadtest.py"))
+
+    def update_project_files(self):
+        self.__update_settings_file()
+        self.__update_url_file()
+
+    def __update_settings_file(self):
+        click.echo(">> [INFO] Updating project settings file")
+        # every edit checks for itself, a re-run on --resume keeps the file (and the user's changes) as it is
+        with open(self.SETTINGS_PATH, "r+") as settings:
+            content = settings.read()
+            env_path = os.path.join(self.DJANGO_DIR, ".env")
+            # a new key would log everybody out
+            if not dotenv_values(env_path).get("SECRET_KEY"):
+                set_key(env_path, "SECRET_KEY", str(uuid.uuid4()))
+
+            if "from decouple import config" not in content:
+                content = content.replace("from pathlib import Path", "from pathlib import Path\nfrom decouple import config\nimport os\n")
+            content = re.sub(r"(SECRET_KEY = )(.*)", r"\1config('SECRET_KEY')", content)
+            installed_apps = list(self.installed_apps)
+            if self.include_rest_auth:
+                installed_apps.append("rest_framework.authtoken")
+
+            if self.include_cors:
+                installed_apps.append("corsheaders")
+                if "CORS_ALLOW_ALL_ORIGINS" not in content:
+                    content += "\nCORS_ALLOW_ALL_ORIGINS = True\n"  # adding at end
+
+            if self.include_static_pipeline:
+                installed_apps.insert(installed_apps.index("django.contrib.staticfiles"), static_pipeline.APP)
+                content = append_block(content, static_pipeline.SETTINGS)
+                storage_path = os.path.join(self.DJANGO_DIR, "config", "storage.py")
+                if not os.path.exists(storage_path):
+                    with open(storage_path, "w") as storage:
+                        storage.write(static_pipeline.STORAGE)
+
+            if self.include_cors or self.include_static_pipeline:
+                middleware = [m for m in self.middleware if self.include_cors or m != "corsheaders.middleware.CorsMiddleware"]
+                if self.include_static_pipeline:
+                    # directly after SecurityMiddleware, static files skip the rest of the stack
+                    middleware.insert(middleware.index("django.middleware.security.SecurityMiddleware") + 1, static_pipeline.MIDDLEWARE)
+                content = merge_list(content, "MIDDLEWARE", [f'"{m}"' for m in middleware])
+
+            if self.include_custom_user:
+                installed_apps.append("users")
+                if "AUTH_USER_MODEL" not in content:
+                    content += '\nAUTH_USER_MODEL = "users.User"\n'
+
+            content = merge_list(content, "INSTALLED_APPS", [f'"{m}"' for m in installed_apps])
+
+            # only the sqlite block startproject writes, credentials filled in since are kept
+            databases = re.search(r"DATABASES = \{[\s\S]*?\}", content)
+            if self.include_postgres_sql and databases and "django.db.backends.sqlite3" in databases.group():
+                content = re.sub(r"(DATABASES = \{)([\s\S]*?)(\})([\s\S]*?)(\})", rf"\1\n    'default': {self.postgresql_db},\n\5", content)
+
+            for block in performance_profiles.settings_blocks(self.performance_profile):
+                content = append_block(content, block)
+            tests_path = os.path.join(self.DJANGO_DIR, "config", "test_performance.py")
+            if self.performance_profile != "none" and not os.path.exists(tests_path):
+                with open(tests_path, "w") as tests:
+                    tests.write(performance_profiles.TESTS)
+
+            static = """STATIC_URL = "static/"
+MEDIA_URL = "media/"
+# STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
+STATIC_ROOT = os.path.join(BASE_DIR, "static")
+MEDIA_ROOT = os.path.join(BASE_DIR, "media")\n"""
+            content = content.replace("STATIC_URL = 'static/'", static)
+            content = content.replace("LANGUAGE_CODE = 'en-us'", "LANGUAGE_CODE = 'pl-PL'")
+            content = content.replace("TIME_ZONE = 'UTC'", "TIME_ZONE = 'Europe/Warsaw'")
+            content = content.replace("ALLOWED_HOSTS = []", "ALLOWED_HOSTS = ['*']")
+            settings.seek(0)
+            settings.write(content)
+            settings.truncate()
+
+        click.echo(click.style(">> [RESULT] Django settings file updated", fg="green"), color=True)
+
+    def select_python_packages(self):
+        packages = [Choice(package, name=label, enabled=package in self.default_packages) for package, label in self.package_choices.items()]
+        self.to_install.extend(
+            inquirer.checkbox(
+                message="Select packages to install:",
+                choices=packages,
+                cycle=False,
+            ).execute(),
+        )
+        if self.deploy_option == "docker":
+            self.to_install.extend(entrypoints.DOCKER_SERVER_PACKAGES)
+
+        self.performance_profile = inquirer.select(
+            message="Select performance profile:",
+            choices=[Choice(name, name=f"{name} - {description}") for name, description in performance_profiles.PROFILES.items()],
+            default="default",
+        ).execute()
+        self.to_install.extend(performance_profiles.PROFILE_PACKAGES.get(self.performance_profile, []))
+        self.__set_package_flags()
+
+    def __set_package_flags(self):
+        self.include_ninja = "django-ninja" in self.to_install
+        self.include_rest_auth = "djangorestframework" in self.to_install
+        self.include_cors = "django-cors-headers" in self.to_install
+        self.include_postgres_sql = "psycopg2" in self.to_install
+        self.include_custom_user = "users" in self.to_install
+        self.include_static_pipeline = static_pipeline.PACKAGE in self.to_install
+
+    def install_python_packages(self):
+        self.__install_libraries()
+
+    def select_nextjs_project(self):
+        self.create_next_js = click.confirm(click.style("Create Next.js project?", fg="cyan"), default=True)
+        self.nextjs_project_name = None
+        if self.create_next_js:
+            if self.deploy_option == "mydevil":
+                self.nextjs_project_name = "public_nodejs"
+            else:
+                self.nextjs_project_name = click.prompt(click.style("Enter Next.js project name", fg="cyan"), default="frontend")
+            self.NEXTJS_DIR = os.path.join(self.PROJECT_DIR, self.nextjs_project_name)
+            if self.nextjs_cache is None:
+                self.nextjs_options = {
+                    name: click.confirm(click.style(question, fg="cyan"), default=default)
+                    for name, (question, default, _, _) in self.nextjs_questions.items()
+                }
+
+    def start_nextjs_project(self):
+        if self.nextjs_cache is not None:
+            self.__start_nextjs_project_from_cache()
+            return
+
+        click.echo(">> [INFO] Creating new Next.js project")
+        # runs next to the pip install, so it gets the answers as flags and no terminal to prompt on
+        flags = [
+            yes if self.nextjs_options.get(name, default) else no
+            for name, (_, default, yes, no) in self.nextjs_questions.items()
+        ]
+        args = ["npx", "--yes", "create-next-app@latest", self.nextjs_project_name, "--yes", *flags, "--use-npm"]
+        if self.tracer.run(args, cwd=self.PROJECT_DIR, input="", env=self.npm_env)[0] != 0:
+            click.echo(click.style(">> [ERROR] NextJS project cannot be created", fg="red"), color=True, err=True)
+            sys.exit(1)
+        click.echo(click.style(">> [RESULT] Next.js project successfully created", fg="green"), color=True)
+
+    def __start_nextjs_project_from_cache(self):
+        if self.refresh_nextjs_template or self.nextjs_cache.version is None:
+            click.echo(">> [INFO] Generating Next.js template with create-next-app@latest")
+            if self.nextjs_cache.populate(self.tracer.run, env=self.npm_env, refresh=self.refresh_nextjs_template) is None:
+                click.echo(click.style(">> [ERROR] Next.js template cannot be created", fg="red"), color=True, err=True)
+                sys.exit(1)
+
+        click.echo(f">> [INFO] Creating new Next.js project from cached template (next {self.nextjs_cache.version})")
+        self.nextjs_cache.materialize(self.NEXTJS_DIR, self.nextjs_project_name)
+        click.echo(click.style(">> [RESULT] Next.js project successfully created", fg="green"), color=True)
+
+    def ask_superuser_credentials(self):
+        if self.include_custom_user:
+            self.superuser = {
+                "email": click.prompt(click.style("Enter email", fg="cyan"), default="admin@example.com"),
+                "password": click.prompt(click.style("Enter password", fg="cyan"), default="!@#qwerty", hide_input=True),
+            }
+        else:
+            self.superuser = {
+                "username": click.prompt(click.style("Enter username", fg="cyan"), default="admin"),
+                "email": click.prompt(click.style("Enter email", fg="cyan"), default="admin@example.com"),
+                "password": click.prompt(click.style("Enter password", fg="cyan"), default="!@#qwerty", hide_input=True),
+            }
+
+    def bootstrap_django(self):
+        # one interpreter and one django.setup() for makemigrations, migrate and the admin user
+        click.echo(">> [INFO] Applying migrations and creating admin")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            job = {"settings": "config.settings", "superuser": self.superuser, "report": os.path.join(temp_dir, "report.json")}
+            code, _ = self.tracer.run(
+                [f"{self.VENV_DIR}/bin/python", os.path.join(self.RUNTIME_DIR, "django_bootstrap.py")],
+                cwd=self.DJANGO_DIR,
+                input=json.dumps(job),
+            )
+            report = {"ok": False, "phases": []}
+            if os.path.exists(job["report"]):
+                with open(job["report"]) as report_file:
+                    report = json.load(report_file)
+
+        for phase in report["phases"]:
+            status = "done" if phase["ok"] else "failed"
+            message = f" ({phase['message']})" if phase["message"] else ""
+            click.echo(f">> [INFO] {phase['name']} {status} in {phase['seconds']:.2f}s{message}")
+
+        if code != 0 or not report["ok"]:
+            click.echo(click.style(">> [ERROR] Migrations cannot be applied or admin user cannot be created", fg="red"), color=True, err=True)
+            sys.exit(1)
+        click.echo(click.style(">> [RESULT] Migrations applied and admin created successfully", fg="green"), color=True)
+
+    def prepare_folder_structure(self):
+        self.DJANGO_DIR = os.path.join(self.PROJECT_DIR, "django")
+        if self.deploy_option == "mydevil":
+            self.DJANGO_DIR = os.path.join(self.PROJECT_DIR, "public_python")
+
+        self.VENV_DIR = os.path.join(self.DJANGO_DIR, "venv")
+        self.SETTINGS_PATH = os.path.join(self.DJANGO_DIR, "config", "settings.py")
+        self.URLS_PATH = os.path.join(self.DJANGO_DIR, "config", "urls.py")
+
+    def select_deploy_option(self):
+        self.deploy_option = inquirer.select(message="Choose deploy option:", choices=self.deploy_options, default="mydevil", style=self._question_style).execute()
+
+    def __build_for_my_devil(self):
+        # click.echo(">> [INFO] Renaming Django project to public_python")
+        # public_python_path = os.path.join(self.PROJECT_DIR, "public_python")
+        # os.rename(self.DJANGO_DIR, public_python_path)
+        # self.DJANGO_DIR = public_python_path
+        self.SETTINGS_PATH = os.path.join(self.DJANGO_DIR, "config", "settings.py")
+        # the web server serves public/ directly, Django never sees these requests
+        with open(self.SETTINGS_PATH, "r+") as settings:
+            content = settings.read()
+            content = re.sub(r"(STATIC_ROOT = )(.*)", r'\1os.path.join(BASE_DIR, "public", "static")', content)
+            content = re.sub(r"(MEDIA_ROOT = )(.*)", r'\1os.path.join(BASE_DIR, "public", "media")', content)
+            settings.seek(0)
+            settings.write(content)
+            settings.truncate()
+
+        if self.create_next_js:
+            click.echo(">> [INFO] Creating app.js in public_nodejs")
+            self.templates.materialize(".nextjs/app.js", os.path.join(self.NEXTJS_DIR, "app.js"))
+            # edit npm build in package.json
+            with open(os.path.join(self.NEXTJS_DIR, "package.json"), "r+") as package_json:
+                content = package_json.read()
+                content = content.replace("next build", "npm install --cpu=wasm32 sharp && next build")
+                package_json.seek(0)
+                package_json.write(content)
+                package_json.truncate()
+
+        click.echo(">> [INFO] Preparing passenger_wsgi.py file")
+        with open(os.path.join(self.DJANGO_DIR, "passenger_wsgi.py"), "w+") as passenger:
+            passenger.write(entrypoints.PASSENGER_WSGI)
+
+    def __write_entrypoints(self):
+        click.echo(">> [INFO] Writing WSGI/ASGI entrypoints")
+        config_dir = os.path.join(self.DJANGO_DIR, "config")
+        files = {
+            os.path.join(config_dir, "warmup.py"): entrypoints.WARMUP,
+            os.path.join(config_dir, "wsgi.py"): entrypoints.WSGI,
+            os.path.join(config_dir, "asgi.py"): entrypoints.ASGI,
+        }
+        if self.deploy_option == "docker":
+            files[os.path.join(self.DJANGO_DIR, "gunicorn.conf.py")] = entrypoints.GUNICORN_CONF
+        for path, content in files.items():
+            with open(path, "w") as file:
+                file.write(content)
+        shutil.copyfile(os.path.join(self.RUNTIME_DIR, "bench_entrypoint.py"), os.path.join(self.DJANGO_DIR, "bench_entrypoint.py"))
+
+    def __build_for_docker(self):
+        treafik_dockerfile_path = ".docker/Dockerfile.treafik"
+        dockecompose_path = ".docker/docker-compose_django_only.yaml"
+
+        app_dir = os.path.join(self.PROJECT_DIR, "apps")
+
+        treafik_path = os.path.join(app_dir, "treafik")
+        django_path = os.path.join(app_dir, "www")
+        nextjs_path = os.path.join(app_dir, "www")
+
+        os.mkdir(app_dir)
+        os.mkdir(treafik_path)
+
+        if self.create_next_js:
+            shutil.move(self.NEXTJS_DIR, nextjs_path)
+            self.NEXTJS_DIR = nextjs_path
+            django_path = os.path.join(app_dir, "django")
+            dockecompose_path = ".docker/docker-compose_django_nextjs.yaml"
+
+        shutil.move(self.DJANGO_DIR, django_path)
+        self.DJANGO_DIR = django_path
+        self.VENV_DIR = os.path.join(self.DJANGO_DIR, "venv")
+        self.SETTINGS_PATH = os.path.join(self.DJANGO_DIR, "config", "settings.py")
+        self.URLS_PATH = os.path.join(self.DJANGO_DIR, "config", "urls.py")
+        # the Dockerfiles are written with the lockfile, see create_requirements
+        self.templates.materialize(treafik_dockerfile_path, os.path.join(treafik_path, "Dockerfile"))
+
+        self.templates.materialize(dockecompose_path, os.path.join(app_dir, "docker-compose.yaml"))
+
+    def build_for_deploy_option(self):
+        self.__write_entrypoints()
+        match self.deploy_option:
+            # static files larger than 4kb to uploadthing!!!!!
+            case "mydevil":
+                click.echo(">> [INFO] Prepating project for MyDevil")
+                # sourcefiles public/static/
+                self.__build_for_my_devil()
+            case "docker":
+                click.echo(">> [INFO] Prepating project for Docker")
+                self.__build_for_docker()
+                # sourcefiles static/
+
+                # $PROJECT_ROOT
+                # ├── apps/treafik  # Load Balancer
+                # ├── apps/postgres ??
+
+                # if next_js
+                # ├── apps/django  # Django Backend
+                # ├── apps/django/requirements # Python Requirements
+                # ├── apps/django/manage.py # Run Django Commands
+                # ├── apps/django/package.json # npm commands.
+                # ├── apps/www  # Django
+
+                # if not next_js
+                # ├── apps/www  # Django
+                # ├── apps/www/requirements # Python Requirements
+                # ├── apps/www/manage.py # Run Django Commands
+
+            case _:
+                pass
+
+    def __wheelhouse_target(self, python_version: str) -> lockfile.Target:
+        match self.deploy_option:
+            case "docker":
+                return lockfile.linux_target(python_version)
+            case "mydevil":
+                # there are no FreeBSD wheels on PyPI, compiled packages are built on the host
+                return lockfile.sdist_target(python_version)
+            case _:
+                return lockfile.local_target(python_version)
+
+    def create_requirements(self):
+        requirements_path = os.path.join(self.DJANGO_DIR, "requirements.txt")
+        pins = lockfile.read_pins(self.VENV_DIR)
+        target = self.__wheelhouse_target(lockfile.venv_python_version(self.VENV_DIR))
+        click.echo(f">> [INFO] Exporting wheelhouse for {target.name} ({len(pins)} packages)")
+        python = os.path.join(self.VENV_DIR, "bin", "python")
+        files = lockfile.WheelStore().export(self.tracer.run, python, pins, target, os.path.join(self.DJANGO_DIR, "wheelhouse"))
+        missing = [str(pin) for pin in pins if pin.key not in files]
+        if missing:
+            click.echo(click.style(f">> [WARNING] No files for {', '.join(missing)}, requirements.txt is pinned without hashes", fg="yellow"))
+        with open(requirements_path, "w") as requirements_txt:
+            requirements_txt.write(lockfile.format_lockfile(pins, files))
+
+        if self.deploy_option == "docker":
+            # gunicorn and whitenoise are found in the lockfile, the Django image builds from the wheelhouse
+            layout = docker_build.analyse(self.PROJECT_DIR)
+            docker_build.write_dockerfiles(layout)
+            for warning in layout.warnings:
+                click.echo(click.style(f">> [WARNING] {warning}", fg="yellow"))
+        click.echo(click.style(f">> [RESULT] requirements.txt locked, {len(files)} files in wheelhouse", fg="green"), color=True)
+
+    def journal_answers(self) -> dict:
+        return {
+            "deploy_option": self.deploy_option,
+            "to_install": self.to_install,
+            "performance_profile": self.performance_profile,
+            "create_next_js": self.create_next_js,
+            "nextjs_project_name": self.nextjs_project_name,
+            "nextjs_options": self.nextjs_options,
+            # the password is never written to disk, it is asked again if the admin is not created yet
+            "superuser": {key: value for key, value in self.superuser.items() if key != "password"},
+            "template": self.template,
+        }
+
+    def journal_state(self) -> dict:
+        # build_for_deploy_option moves folders around, a resumed run has to find them (relative, the project may move)
+        paths = {
+            "DJANGO_DIR": self.DJANGO_DIR,
+            "VENV_DIR": self.VENV_DIR,
+            "SETTINGS_PATH": self.SETTINGS_PATH,
+            "URLS_PATH": self.URLS_PATH,
+            "NEXTJS_DIR": getattr(self, "NEXTJS_DIR", None),
+        }
+        return {name: os.path.relpath(path, self.PROJECT_DIR) if path else None for name, path in paths.items()}
+
+    def apply_answers(self, answers: dict):
+        self.deploy_option = answers["deploy_option"]
+        self.prepare_folder_structure()
+        self.to_install = list(answers["to_install"])
+        self.performance_profile = answers.get("performance_profile", "none")
+        self.__set_package_flags()
+        self.superuser = dict(answers["superuser"])
+        self.create_next_js = answers["create_next_js"]
+        self.nextjs_project_name = answers["nextjs_project_name"]
+        self.nextjs_options = dict(answers.get("nextjs_options", {}))
+        self.template = answers.get("template")
+        if self.create_next_js:
+            self.NEXTJS_DIR = os.path.join(self.PROJECT_DIR, self.nextjs_project_name)
+
+    def __apply_journal(self):
+        self.apply_answers(self.journal.answers)
+        for name, value in self.journal.state.items():
+            if value is not None:
+                # journals written before paths were relative hold absolute ones, join keeps those
+                setattr(self, name, os.path.normpath(os.path.join(self.PROJECT_DIR, value)))
+
+    def ask_questions(self):
+        self.set_project_name()
+        if self.resume:
+            self.__apply_journal()
+            self.load_templates()
+            if not self.journal.has("bootstrap_django"):
+                self.superuser["password"] = click.prompt(click.style("Enter password", fg="cyan"), default="!@#qwerty", hide_input=True)
+            return
+
+        self.load_templates()
+        self.select_deploy_option()
+        self.prepare_folder_structure()
+        self.select_python_packages()
+        self.ask_superuser_credentials()
+        self.select_nextjs_project()
+        self.journal.data["answers"] = self.journal_answers()
+        self.journal.save()
+
+    def configure(self, name: str, answers: dict):
+        """ask_questions without prompts, ``answers`` as in journal_answers plus the superuser password.
+
+        With ``resume`` a folder with a journal continues from its own answers.
+        """
+        self.PROJECT_NAME = name
+        self.PROJECT_DIR = os.path.join(self.BASE_DIR, name)
+        self.journal = StepJournal(self.PROJECT_DIR, state=self.journal_state)
+        if self.resume and self.journal.exists():
+            self.journal.load()
+            self.__apply_journal()
+            self.superuser["password"] = answers["superuser"].get("password", "!@#qwerty")
+        else:
+            os.mkdir(self.PROJECT_DIR)
+            self.apply_answers(answers)
+            self.journal.data["answers"] = self.journal_answers()
+            self.journal.save()
+        self.load_templates()
+
+    def plan_steps(self) -> StepScheduler:
+        # python chain and node chain are independent, deploy build waits for both
+        scheduler = StepScheduler(jobs=self.jobs, tracer=self.tracer, journal=self.journal)
+        django_file = lambda *path: os.path.join(self.DJANGO_DIR, *path)  # noqa: E731
+        scheduler.add(
+            "create_venv",
+            self.create_venv,
+            inputs=lambda: {"python": python_version("python3")},
+            outputs=lambda: [os.path.join(self.VENV_DIR, "pyvenv.cfg"), os.path.join(self.VENV_DIR, "bin", "python")],
+            clean=lambda: [self.VENV_DIR],
+        )
+        scheduler.add(
+            "install_python_packages",
+            self.install_python_packages,
+            requires=["create_venv"],
+            inputs=lambda: {"packages": self.python_packages},
+            outputs=lambda: [os.path.join(self.VENV_DIR, "lib")],
+        )
+        scheduler.add(
+            "start_django_project",
+            self.start_django_project,
+            requires=["install_python_packages"],
+            inputs=lambda: {"custom_user": self.include_custom_user},
+            # settings.py and urls.py are edited by later steps and by the user, only untouched files count
+            outputs=lambda: [django_file("manage.py"), django_file("config", "__init__.py")],
+            clean=lambda: [django_file("manage.py"), django_file("config"), django_file("users")],
+        )
+        # scheduler.add("start_django_app", self.start_django_app, requires=["start_django_project"])
+        scheduler.add(
+            "update_project_files",
+            self.update_project_files,
+            requires=["start_django_project"],
+            inputs=lambda: {"packages": self.to_install, "performance_profile": self.performance_profile},
+        )
+        scheduler.add(
+            "bootstrap_django",
+            self.bootstrap_django,
+            requires=["update_project_files"],
+            inputs=lambda: {key: value for key, value in self.superuser.items() if key != "password"},
+            outputs=lambda: [django_file("db.sqlite3")],
+        )
+        build_requires = ["bootstrap_django"]
+        if self.create_next_js:
+            scheduler.add(
+                "start_nextjs_project",
+                self.start_nextjs_project,
+                inputs=lambda: {"name": self.nextjs_project_name, "options": self.nextjs_options, "template": self.nextjs_cache.version if self.nextjs_cache else None},
+                outputs=lambda: [os.path.join(self.NEXTJS_DIR, "package.json")],
+                clean=lambda: [self.NEXTJS_DIR],
+            )
+            build_requires.append("start_nextjs_project")
+        scheduler.add(
+            "build_for_deploy_option",
+            self.build_for_deploy_option,
+            requires=build_requires,
+            inputs=lambda: {"deploy_option": self.deploy_option},
+            outputs=lambda: [django_file("manage.py")],
+        )
+        scheduler.add(
+            "add_run_dev",
+            self.add_run_dev,
+            requires=["build_for_deploy_option"],
+            inputs=lambda: {"yadpm": self.yadpm_command(), "nextjs": self.create_next_js, "template": self.templates.digest},
+            outputs=lambda: [os.path.join(self.PROJECT_DIR, "run_dev.sh")],
+        )
+        scheduler.add(
+            "create_requirements",
+            self.create_requirements,
+            requires=["build_for_deploy_option"],
+            inputs=lambda: {"packages": self.to_install, "deploy_option": self.deploy_option},
+            outputs=lambda: [django_file("requirements.txt"), django_file("wheelhouse")],
+        )
+        if self.templates.members("project"):
+            # files under project/ in a --template pack are written last, over the generated ones
+            scheduler.add(
+                "apply_template",
+                self.apply_template,
+                requires=["add_run_dev", "create_requirements"],
+                inputs=lambda: {"template": self.templates.digest},
+            )
+        return scheduler
+
+    def write_profile(self):
+        click.echo(">> [INFO] Step timings")
+        click.echo(self.tracer.format_summary())
+        self.tracer.write(self.profile)
+        click.echo(f">> [INFO] Chrome trace written to {self.profile} (open in chrome://tracing or ui.perfetto.dev)")
+
+    def run_steps(self):
+        self.tracer.root = self.PROJECT_DIR
+        try:
+            self.plan_steps().run()
+        finally:
+            if self.profile is not None:
+                self.write_profile()
+
+    def create_project(self):
+        self.ask_questions()
+        try:
+            self.run_steps()
+        except SystemExit as exc:
+            if exc.code:
+                click.echo(click.style(">> [INFO] Fix the problem and run 'start-project --resume' to continue", fg="yellow"), color=True, err=True)
+            raise
+
+        click.echo(click.style(">> [RESULT] Succes!", fg="green"), color=True)
+        sys.exit(0)
@@ -1,34 +1,273 @@
-import subprocess
-import sys
-import threading
+import asyncio
+import json
+import os
+import shlex
+import signal
+from urllib.parse import urlsplit
 
 import click
 
+from watcher import create_watcher
 
-def django_app(path: str):
-    subprocess.run(["venv/bin/python", "manage.py", "runserver"], cwd=path, check=False)
+COLORS = ["green", "blue", "magenta", "cyan", "yellow", "red"]
+STABLE_AFTER = 30  # seconds a service has to run before its restart backoff is reset
+MAX_BACKOFF = 30
+STOP_TIMEOUT = 10
 
 
-def next_js_app(path: str):
-    subprocess.run(["npm", "run", "dev"], cwd=path, check=False)
+class Service:
+    def __init__(
+        self,
+        name: str,
+        command: list[str],
+        cwd: str,
+        probe: str | None = None,
+        env: dict[str, str] | None = None,
+        watch: str | None = None,
+    ):
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        self.probe = probe
+        self.env = env or {}
+        # directory whose changes restart the service (for servers started without their own reloader)
+        self.watch = watch
+        self.color = "white"
+        self.process: asyncio.subprocess.Process | None = None
+        self.restart_requested = False
+        self.wakeup = asyncio.Event()
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "Service":
+        command = data["command"]
+        if isinstance(command, str):
+            # quoted arguments stay whole, e.g. "python -c 'print(1)'"
+            command = shlex.split(command)
+        return cls(data["name"], command, data.get("cwd", "."), data.get("probe"), data.get("env"), data.get("watch"))
 
-@click.command()
-@click.option("--django", required=True)
-@click.option("--nextjs", required=True)
-def main(django, nextjs):
-    DJANGO_BASE_DIR = f"'{django}'"
-    NEXTJS_BASE_DIR = f"'{nextjs}'"
-    print(sys.argv)
 
-    thread_1 = threading.Thread(target=django_app, kwargs={"path": DJANGO_BASE_DIR})
-    thread_2 = threading.Thread(target=next_js_app, kwargs={"path": NEXTJS_BASE_DIR})
-    thread_1.start()
-    thread_2.start()
+class LogMultiplexer:
+    """Prefixes the output of all services and writes it from a single task.
 
-    thread_1.join()
-    thread_2.join()
+    Readers never wait for the terminal: lines go through a bounded queue and are
+    dropped (and counted) when the writer cannot keep up.
+    """
 
+    def __init__(self, max_lines: int = 10000):
+        self.queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue(maxsize=max_lines)
+        self.dropped = 0
+        self.width = 0
 
-if __name__ == "__main__":
-    main()
+    def write(self, service: Service | None, line: str):
+        prefix = click.style(f"{(service.name if service else 'dev'):<{self.width}} |", fg=service.color if service else "white")
+        try:
+            self.queue.put_nowait((prefix, line.rstrip("\n")))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def run(self):
+        while True:
+            prefix, line = await self.queue.get()
+            if self.dropped:
+                click.echo(f"{prefix} ... {self.dropped} lines dropped")
+                self.dropped = 0
+            click.echo(f"{prefix} {line}")
+
+    async def drain(self):
+        while not self.queue.empty():
+            await asyncio.sleep(0.01)
+
+
+async def probe_http(url: str) -> bool:
+    parts = urlsplit(url)
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, parts.port or 80), timeout=2)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    try:
+        writer.write(f"GET {parts.path or '/'} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout=30)
+        return status_line.startswith(b"HTTP/")
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        writer.close()
+
+
+class Supervisor:
+    """Runs services as process groups, restarts them when they crash and stops them together."""
+
+    def __init__(self, services: list[Service], ready_timeout: float = 120, debounce: float = 0.2):
+        self.services = services
+        self.ready_timeout = ready_timeout
+        self.debounce = debounce
+        self.logs = LogMultiplexer()
+        self.logs.width = max((len(s.name) for s in services), default=3)
+        for i, service in enumerate(services):
+            service.color = COLORS[i % len(COLORS)]
+        self.stopping = asyncio.Event()
+
+    async def _pump(self, service: Service, stream: asyncio.StreamReader):
+        while True:
+            try:
+                line = await stream.readline()
+            except ValueError:  # line longer than the stream limit
+                line = await stream.read(64 * 1024)
+            if not line:
+                break
+            self.logs.write(service, line.decode(errors="replace"))
+
+    async def _wait_ready(self, service: Service):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        while loop.time() - started < self.ready_timeout:
+            if service.process is None or service.process.returncode is not None:
+                return
+            if await probe_http(service.probe):
+                self.logs.write(service, click.style(f"ready on {service.probe} after {loop.time() - started:.1f}s", bold=True))
+                return
+            await asyncio.sleep(0.5)
+        self.logs.write(service, click.style(f"not ready on {service.probe} after {self.ready_timeout:.0f}s", fg="red"))
+
+    async def _sleep(self, service: Service, seconds: float):
+        """Wait before a restart, cut short by ``stop`` or by a change in the watched files."""
+        service.wakeup.clear()
+        waiters = [asyncio.ensure_future(self.stopping.wait()), asyncio.ensure_future(service.wakeup.wait())]
+        await asyncio.wait(waiters, timeout=seconds, return_when=asyncio.FIRST_COMPLETED)
+        for waiter in waiters:
+            waiter.cancel()
+
+    async def supervise(self, service: Service):
+        loop = asyncio.get_running_loop()
+        backoff = 1.0
+        while not self.stopping.is_set():
+            try:
+                service.process = await asyncio.create_subprocess_exec(
+                    *service.command,
+                    cwd=service.cwd,
+                    env={**os.environ, **service.env},
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    start_new_session=True,  # own process group, so children (node, reloaders) are stopped too
+                    limit=1024 * 1024,
+                )
+            except OSError as exc:
+                self.logs.write(service, click.style(f"cannot start {service.command[0]}: {exc}", fg="red"))
+                await self._sleep(service, backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+
+            started = loop.time()
+            self.logs.write(service, f"started (pid {service.process.pid}): {' '.join(service.command)}")
+            tasks = [self._pump(service, service.process.stdout), self._pump(service, service.process.stderr)]
+            if service.probe:
+                tasks.append(self._wait_ready(service))
+            code, *_ = await asyncio.gather(service.process.wait(), *tasks)
+
+            if self.stopping.is_set():
+                break
+            if service.restart_requested:
+                service.restart_requested = False
+                backoff = 1.0
+                continue
+            if service.wakeup.is_set():
+                continue
+            if loop.time() - started > STABLE_AFTER:
+                backoff = 1.0
+            self.logs.write(service, click.style(f"exited with {code}, restarting in {backoff:.0f}s", fg="red"))
+            await self._sleep(service, backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def _signal_group(self, service: Service, sig: int):
+        if service.process is None or service.process.returncode is not None:
+            return
+        try:
+            os.killpg(service.process.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def restart(self, service: Service):
+        if service.process is None or service.process.returncode is not None:
+            service.wakeup.set()  # crashed and waiting for its backoff, start it now
+            return
+        service.restart_requested = True
+        self._signal_group(service, signal.SIGTERM)
+
+    async def watch(self, service: Service, debounce: float):
+        watcher = create_watcher(service.watch)
+        self.logs.write(service, f"watching {watcher.root} ({type(watcher).__name__})")
+        try:
+            async for changed in watcher.changes(debounce=debounce):
+                names = ", ".join(sorted(os.path.relpath(path, watcher.root) for path in changed)[:3])
+                more = f" and {len(changed) - 3} more" if len(changed) > 3 else ""
+                self.logs.write(service, click.style(f"changed: {names}{more}, restarting", fg="yellow"))
+                self.restart(service)
+        finally:
+            watcher.close()
+
+    async def stop(self):
+        self.stopping.set()
+        running = [s for s in self.services if s.process is not None and s.process.returncode is None]
+        for service in running:
+            self._signal_group(service, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(s.process.wait() for s in running)), timeout=STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            for service in running:
+                self._signal_group(service, signal.SIGKILL)
+        for service in self.services:
+            # leftovers of the group (e.g. a node process whose parent already exited)
+            if service.process is not None:
+                try:
+                    os.killpg(service.process.pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError):
+                    pass
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stopping.set)
+
+        writer = asyncio.create_task(self.logs.run())
+        supervisors = [asyncio.create_task(self.supervise(service)) for service in self.services]
+        watchers = [asyncio.create_task(self.watch(service, self.debounce)) for service in self.services if service.watch]
+        await self.stopping.wait()
+        for task in watchers:
+            task.cancel()
+        self.logs.write(None, "stopping...")
+        await self.stop()
+        await asyncio.gather(*supervisors, return_exceptions=True)
+        await self.logs.drain()
+        writer.cancel()
+
+
+def default_services(django: str | None, nextjs: str | None) -> list[Service]:
+    services = []
+    if django:
+        # Django's own StatReloader stats every module once a second, the shared watcher restarts it instead
+        services.append(
+            Service(
+                "django",
+                [os.path.join("venv", "bin", "python"), "manage.py", "runserver", "--noreload"],
+                django,
+                "http://127.0.0.1:8000/",
+                watch=django,
+            ),
+        )
+    if nextjs:
+        services.append(Service("nextjs", ["npm", "run", "dev"], nextjs, "http://127.0.0.1:3000/"))
+    return services
+
+
+def run(django: str | None, nextjs: str | None, config_path: str | None, debounce: float):
+    """Entry point of ``yadpm dev``, runs until Ctrl-C or SIGTERM."""
+    services = default_services(django, nextjs)
+    if config_path:
+        with open(config_path) as config_file:
+            services.extend(Service.from_dict(data) for data in json.load(config_file)["services"])
+    if not services:
+        raise click.ClickException("Nothing to run, use --django, --nextjs or --config")
+
+    asyncio.run(Supervisor(services, debounce=debounce).run())
@@ -0,0 +1,122 @@
+"""Smoke benchmark of the generated entrypoints.
+
+Imports every entrypoint of this project (config.wsgi, config.asgi and
+passenger_wsgi.py when present), then calls each application in process and
+reports how long the import took and the per-request overhead. Run it from the
+Django directory with the project's venv:
+
+    venv/bin/python bench_entrypoint.py [--path /admin/login/] [--requests 200] [--max-ms 50]
+"""
+
+import argparse
+import asyncio
+import importlib
+import io
+import os
+import statistics
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+
+def wsgi_request(application, path: str) -> int:
+    environ = {"PATH_INFO": path, "HTTP_HOST": "localhost", "wsgi.input": io.BytesIO()}
+    setup_testing_defaults(environ)
+    status = []
+    body = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    for _ in body:
+        pass
+    if hasattr(body, "close"):
+        body.close()
+    return int(status[0].split()[0])
+
+
+def asgi_request(application, path: str, loop: asyncio.AbstractEventLoop) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("localhost", 80),
+    }
+    status = []
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    done = asyncio.Event()
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await done.wait()  # the client stays connected until the response is sent
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+
+    loop.run_until_complete(application(scope, receive, send))
+    return status[0]
+
+
+def bench(name: str, module: str, path: str, requests: int, loop) -> dict:
+    start = time.perf_counter()
+    application = importlib.import_module(module).application
+    import_ms = (time.perf_counter() - start) * 1000
+
+    call = (lambda: asgi_request(application, path, loop)) if name == "asgi" else (lambda: wsgi_request(application, path))
+    start = time.perf_counter()
+    status = call()
+    first_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "target": name,
+        "status": status,
+        "import_ms": import_ms,
+        "first_ms": first_ms,
+        "p50_ms": statistics.median(timings),
+        "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default="/admin/login/")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--max-ms", type=float, default=50, help="fail when the p50 of a target is slower")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+    targets = [("wsgi", "config.wsgi"), ("asgi", "config.asgi")]
+    if os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), "passenger_wsgi.py")):
+        targets.append(("passenger", "passenger_wsgi"))
+
+    loop = asyncio.new_event_loop()
+    results = [bench(name, module, args.path, args.requests, loop) for name, module in targets]
+    loop.close()
+
+    print(f"{'target':<12}{'status':>8}{'import ms':>12}{'first ms':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    failed = False
+    for row in results:
+        print(f"{row['target']:<12}{row['status']:>8}{row['import_ms']:>12.1f}{row['first_ms']:>10.2f}{row['p50_ms']:>9.2f}{row['p99_ms']:>9.2f}")
+        failed = failed or row["status"] >= 500 or row["p50_ms"] > args.max_ms
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
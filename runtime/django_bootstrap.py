@@ -0,0 +1,74 @@
+"""Runs makemigrations, migrate and the superuser creation in a single Django process.
+
+Started by yadpm with the new project's venv python from the Django directory.
+The job is read as JSON from stdin:
+
+    {"settings": "config.settings", "superuser": {"email": ..., "password": ...}, "report": "/path/report.json"}
+
+and a JSON report with the duration and result of every phase is written to
+``report``. The exit status is 1 if any phase failed.
+"""
+
+import json
+import os
+import sys
+import time
+import traceback
+
+
+def create_superuser(fields: dict) -> str:
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()  # noqa: N806
+    username = fields.get(User.USERNAME_FIELD)
+    if User.objects.filter(**{User.USERNAME_FIELD: username}).exists():
+        return f"{username} already exists"
+    User.objects.create_superuser(**fields)
+    return f"{username} created"
+
+
+def main() -> int:
+    job = json.load(sys.stdin)
+    sys.path.insert(0, os.getcwd())
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", job.get("settings", "config.settings"))
+
+    report: dict = {"ok": True, "phases": []}
+
+    def phase(name, func):
+        start = time.perf_counter()
+        result = {"name": name, "ok": True, "seconds": 0.0, "message": ""}
+        try:
+            result["message"] = func() or ""
+        except Exception as exc:  # noqa: BLE001
+            traceback.print_exc()
+            result.update(ok=False, message=f"{type(exc).__name__}: {exc}")
+            report["ok"] = False
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        report["phases"].append(result)
+        return result["ok"]
+
+    def setup():
+        import django
+
+        django.setup()
+
+    def call(command):
+        from django.core.management import call_command
+
+        return lambda: call_command(command, interactive=False)
+
+    phases = [("setup", setup), ("makemigrations", call("makemigrations")), ("migrate", call("migrate"))]
+    if job.get("superuser"):
+        phases.append(("createsuperuser", lambda: create_superuser(job["superuser"])))
+
+    for name, func in phases:
+        if not phase(name, func):
+            break
+
+    with open(job["report"], "w") as file:
+        json.dump(report, file)
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
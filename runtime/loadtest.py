@@ -0,0 +1,285 @@
+"""Load test of the users API (POST /api/auth/by-token and /api/auth/by-email).
+
+Seeds test users with tokens in bulk (in process, through Django), then runs an
+asyncio load generator with a pool of keep-alive connections against a running
+server (runserver, gunicorn, ...). Only the standard library is used for the
+requests. Run it from the Django directory with the project's venv:
+
+    venv/bin/python manage.py runserver --noreload        # or gunicorn -c gunicorn.conf.py
+    venv/bin/python loadtest.py --concurrency 32 --duration 20 [--rate 500] [--json loadtest.json]
+
+by-email checks a password, which is slow on purpose (PBKDF2), the default mix
+is mostly by-token. With ``--rate`` latencies are measured from the moment a
+request was due, so a server that falls behind shows it in the percentiles.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from urllib.parse import urlsplit
+
+SEED_PASSWORD = "loadtest-password"  # noqa: S105
+SEED_PREFIX = "loadtest-"
+
+
+def seed(count: int, settings: str) -> list[dict]:
+    """Create ``count`` users with tokens, reusing the ones from an earlier run."""
+    sys.path.insert(0, os.getcwd())
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings)
+    import django
+
+    django.setup()
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from rest_framework.authtoken.models import Token
+
+    user_model = get_user_model()
+    emails = [f"{SEED_PREFIX}{i}@example.com" for i in range(count)]
+    existing = set(user_model.objects.filter(email__startswith=SEED_PREFIX).values_list("email", flat=True))
+    # hashing once instead of once per user, the hash is the same for every seeded user
+    password = make_password(SEED_PASSWORD)
+    user_model.objects.bulk_create([user_model(email=email, password=password) for email in emails if email not in existing], batch_size=500)
+
+    users = {user.pk: user for user in user_model.objects.filter(email__startswith=SEED_PREFIX)}
+    tokens = dict(Token.objects.filter(user_id__in=users.keys()).values_list("user_id", "key"))
+    missing = [Token(user=user, key=Token.generate_key()) for pk, user in users.items() if pk not in tokens]
+    Token.objects.bulk_create(missing, batch_size=500)
+    tokens.update({token.user_id: token.key for token in missing})
+    wanted = set(emails)
+    return [{"email": user.email, "password": SEED_PASSWORD, "token": tokens[pk]} for pk, user in users.items() if user.email in wanted]
+
+
+class HttpPool:
+    """HTTP/1.1 client keeping up to ``size`` connections open between requests."""
+
+    def __init__(self, url: str, size: int, timeout: float):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.slots = asyncio.Semaphore(size)
+        self.opened = 0
+
+    async def _connect(self):
+        self.opened += 1
+        return await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+
+    async def _exchange(self, connection, request: bytes) -> tuple[int, bytes, bool]:
+        reader, writer = connection
+        writer.write(request)
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by the server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                body += chunk[:-2]
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            headers["connection"] = "close"
+        keep_alive = headers.get("connection", "").lower() != "close" and status_line.startswith(b"HTTP/1.1")
+        return status, body, keep_alive
+
+    async def post(self, path: str, payload: dict) -> tuple[int, bytes]:
+        body = json.dumps(payload).encode()
+        request = (
+            f"POST {self.prefix}{path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n"
+        ).encode() + body
+        async with self.slots:
+            reused = bool(self.idle)
+            connection = self.idle.pop() if reused else await self._connect()
+            try:
+                status, response, keep_alive = await asyncio.wait_for(self._exchange(connection, request), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                connection[1].close()
+                if not reused:
+                    raise
+                # the server closed an idle connection, try once more on a new one
+                connection = await self._connect()
+                status, response, keep_alive = await asyncio.wait_for(self._exchange(connection, request), self.timeout)
+            except BaseException:
+                connection[1].close()
+                raise
+            if keep_alive:
+                self.idle.append(connection)
+            else:
+                connection[1].close()
+            return status, response
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+
+class RateLimiter:
+    """Hands out evenly spaced start times, ``rate`` per second over all workers."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next = time.perf_counter()
+
+    async def wait(self) -> float:
+        if not self.interval:
+            return time.perf_counter()
+        due = self.next
+        self.next += self.interval
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return due
+
+
+async def load(args, users: list[dict]) -> dict:
+    pool = HttpPool(args.url, args.concurrency, args.timeout)
+    limiter = RateLimiter(args.rate)
+    endpoints = [name for name, weight in args.mix.items() for _ in range(weight)]
+    samples: dict[str, list[float]] = {name: [] for name in args.mix}
+    errors: dict[str, int] = {name: 0 for name in args.mix}
+    error_examples: list[str] = []
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    stop_at = measure_from + args.duration
+
+    async def worker():
+        while True:
+            due = await limiter.wait()
+            if due >= stop_at:
+                return
+            endpoint = random.choice(endpoints)
+            user = random.choice(users)
+            payload = {"token": user["token"]} if endpoint == "by-token" else {"email": user["email"], "password": user["password"]}
+            ok = False
+            try:
+                status, body = await pool.post(f"/api/auth/{endpoint}", payload)
+                ok = status == 200
+                if not ok and len(error_examples) < 5:
+                    error_examples.append(f"{endpoint}: HTTP {status} {body[:200]!r}")
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+                if len(error_examples) < 5:
+                    error_examples.append(f"{endpoint}: {type(exc).__name__} {exc}")
+            finished = time.perf_counter()
+            if due < measure_from:
+                continue
+            if ok:
+                samples[endpoint].append((finished - due) * 1000)
+            else:
+                errors[endpoint] += 1
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    finally:
+        pool.close()
+    elapsed = min(time.perf_counter(), stop_at) - measure_from
+
+    def percentile(values: list[float], q: float) -> float | None:
+        if not values:
+            return None
+        values = sorted(values)
+        return round(values[min(len(values) - 1, int(q / 100 * len(values)))], 2)
+
+    endpoints_report = {}
+    for name, values in samples.items():
+        endpoints_report[name] = {
+            "requests": len(values),
+            "errors": errors[name],
+            "rps": round(len(values) / elapsed, 1) if elapsed > 0 else 0,
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+            "max_ms": round(max(values), 2) if values else None,
+            "mean_ms": round(statistics.fmean(values), 2) if values else None,
+        }
+    total = sum(len(values) for values in samples.values())
+    return {
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        "duration_s": round(elapsed, 2),
+        "connections_opened": pool.opened,
+        "rps": round(total / elapsed, 1) if elapsed > 0 else 0,
+        "endpoints": endpoints_report,
+        "error_examples": error_examples,
+    }
+
+
+def print_report(report: dict):
+    print(f"{report['url']}  concurrency {report['concurrency']}  rate {report['rate'] or 'max'}  {report['duration_s']}s  {report['connections_opened']} connections")
+    print(f"{'endpoint':<12}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for name, row in report["endpoints"].items():
+        cells = [row[key] if row[key] is not None else "-" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")]
+        print(f"{name:<12}{row['requests']:>10}{row['errors']:>8}{row['rps']:>9}" + "".join(f"{cell:>9}" for cell in cells))
+    print(f"{'total':<12}{'':>10}{'':>8}{report['rps']:>9}")
+    for example in report["error_examples"]:
+        print(f"error: {example}")
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("by-token", "by-email"):
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="server to test")
+    parser.add_argument("--users", type=int, default=200, help="test users to seed")
+    parser.add_argument("--no-seed", action="store_true", help="use the users from the last run (loadtest-users.json)")
+    parser.add_argument("--settings", default="config.settings", help="DJANGO_SETTINGS_MODULE used for seeding")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight (and pooled connections)")
+    parser.add_argument("--rate", type=float, default=0, help="requests per second over all workers, 0 for as fast as possible")
+    parser.add_argument("--duration", type=float, default=15, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds of load before measuring")
+    parser.add_argument("--mix", type=parse_mix, default="by-token=9,by-email=1", help="endpoint weights")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds per request")
+    parser.add_argument("--json", dest="json_path", help="write the report to this file")
+    args = parser.parse_args()
+
+    users_path = "loadtest-users.json"
+    if args.no_seed:
+        with open(users_path) as users_file:
+            users = json.load(users_file)
+    else:
+        started = time.perf_counter()
+        users = seed(args.users, args.settings)
+        print(f"seeded {len(users)} users in {time.perf_counter() - started:.2f}s")
+        with open(users_path, "w") as users_file:
+            json.dump(users, users_file)
+
+    report = asyncio.run(load(args, users))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as json_file:
+            json.dump(report, json_file, indent=2)
+    sys.exit(1 if not any(row["requests"] for row in report["endpoints"].values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import os
+import shutil
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Callable
+
+DEFAULT_JOBS = 2
+
+
+@dataclass
+class Step:
+    name: str
+    func: Callable[[], object]
+    requires: tuple[str, ...] = field(default_factory=tuple)
+    # used by the journal: what the step depends on and which files it produces
+    inputs: Callable[[], dict] = dict
+    outputs: Callable[[], list[str]] = list
+    # paths removed before the step is run again on top of an attempt that did not finish
+    clean: Callable[[], list[str]] = list
+
+
+class StepScheduler:
+    """Runs steps on a worker pool as soon as all steps they require are finished.
+
+    Steps are started in the order they were added, so with ``jobs=1`` the run is
+    the plain sequential one. If a step fails no new steps are started, the running
+    ones are allowed to finish and the first error is raised again.
+
+    With a journal, a step is skipped when the journal has it done with the same
+    inputs and outputs and none of the steps it requires had to run again.
+    """
+
+    def __init__(self, jobs: int | None = None, tracer=None, journal=None):
+        self.jobs = max(1, jobs or DEFAULT_JOBS)
+        self.tracer = tracer
+        self.journal = journal
+        self.steps: dict[str, Step] = {}
+        self.skipped: set[str] = set()
+        self.finished: set[str] = set()
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        name: str,
+        func: Callable[[], object],
+        requires: tuple[str, ...] | list[str] = (),
+        inputs: Callable[[], dict] = dict,
+        outputs: Callable[[], list[str]] = list,
+        clean: Callable[[], list[str]] = list,
+    ):
+        if name in self.steps:
+            raise ValueError(f"Step '{name}' already added")
+        self.steps[name] = Step(name, func, tuple(requires), inputs, outputs, clean)
+
+    def order(self) -> list[str]:
+        for step in self.steps.values():
+            for required in step.requires:
+                if required not in self.steps:
+                    raise ValueError(f"Step '{step.name}' requires unknown step '{required}'")
+
+        ordered: list[str] = []
+        done: set[str] = set()
+        while len(ordered) < len(self.steps):
+            ready = [s.name for s in self.steps.values() if s.name not in done and all(r in done for r in s.requires)]
+            if not ready:
+                cycle = ", ".join(s for s in self.steps if s not in done)
+                raise ValueError(f"Steps depend on each other: {cycle}")
+            ordered.extend(ready)
+            done.update(ready)
+        return ordered
+
+    def _can_skip(self, step: Step) -> bool:
+        if self.journal is None or not all(required in self.skipped for required in step.requires):
+            return False
+        return self.journal.is_done(step.name, step.inputs(), step.outputs())
+
+    def _record(self, step: Step):
+        with self._lock:
+            self.finished.add(step.name)
+            self.journal.record(step.name, step.inputs(), step.outputs())
+            for name in self.finished - {step.name}:
+                self.journal.refresh(name, self.steps[name].outputs())
+            self.journal.save()
+
+    def _run_step(self, step: Step):
+        if self._can_skip(step):
+            self.skipped.add(step.name)
+            self.finished.add(step.name)
+            return None
+
+        # files of a finished step changed afterwards are someone's edits, they are never removed
+        if self.journal is not None and not self.journal.finished_with(step.name, step.inputs()):
+            self.journal.forget(step.name)
+            for path in step.clean():
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                elif os.path.lexists(path):
+                    os.remove(path)
+
+        with self.tracer.step(step.name) if self.tracer is not None else nullcontext():
+            result = step.func()
+        if self.journal is not None:
+            self._record(step)
+        return result
+
+    def run(self):
+        self.order()  # validate before anything starts
+        remaining = {name: set(step.requires) for name, step in self.steps.items()}
+        running: dict[Future, str] = {}
+        error: BaseException | None = None
+
+        with ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="step") as pool:
+            while remaining or running:
+                if error is None:
+                    ready = [name for name, requires in remaining.items() if not requires]
+                    for name in ready[: self.jobs - len(running)]:
+                        del remaining[name]
+                        running[pool.submit(self._run_step, self.steps[name])] = name
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    exc = future.exception()
+                    if exc is not None:
+                        error = error or exc
+                        continue
+                    for requires in remaining.values():
+                        requires.discard(name)
+
+        if error is not None:
+            raise error
@@ -0,0 +1,24 @@
+"""Settings values start-project writes, shared with ``yadpm upgrade``.
+
+Kept apart from project_manager so the upgrade workers import them without
+click, InquirerPy and the rest of the interactive manager.
+"""
+
+MIDDLEWARE = [
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+POSTGRESQL_DB = {
+    "ENGINE": "django.db.backends.postgresql",
+    "NAME": "<db_name>",
+    "USER": "<db_username>",
+    "PASSWORD": "<password>",
+    "HOST": "<db_hostname_or_ip>",
+    "PORT": "<db_port>",
+}
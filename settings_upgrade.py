@@ -0,0 +1,312 @@
+"""Settings patches for projects generated earlier, see ``yadpm upgrade``.
+
+Every ``config/settings.py`` is parsed once with ``ast``. Patches look at the
+top-level assignments and record edits of source segments (a list literal, a
+value, text inserted after a statement), all applied in one pass, so comments
+and formatting around them are kept. A patch only records edits where the
+file differs from what start-project writes today, running it again changes
+nothing. ``<project>/.yadpm/upgrade.json`` keeps the hash of every settings
+file after its last upgrade, files nobody changed since are not parsed again.
+"""
+
+import ast
+import difflib
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import settings_defaults
+import static_pipeline
+from fs_utils import write_atomic
+from journal import JOURNAL_PATH
+
+# bump when a patch changes, files upgraded by an older set are patched again
+VERSION = 1
+STATE_PATH = os.path.join(".yadpm", "upgrade.json")
+PRUNED = {"venv", "node_modules", "__pycache__", "static", "media", "wheelhouse", "public_nodejs"}
+CORS_MIDDLEWARE = "corsheaders.middleware.CorsMiddleware"
+CORS_SETTINGS = ("CORS_ALLOW_ALL_ORIGINS", "CORS_ALLOWED_ORIGINS", "CORS_ALLOWED_ORIGIN_REGEXES")
+POSTGRES_ENGINES = {"django.db.backends.postgresql", "django.db.backends.postgresql_psycopg2"}
+
+
+class SettingsFile:
+    """A parsed settings module and the edits recorded for it, offsets are in bytes like ``ast``'s."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.data = source.encode()
+        self.tree = ast.parse(self.data)
+        self._line_starts = [0]
+        for line in self.data.splitlines(keepends=True):
+            self._line_starts.append(self._line_starts[-1] + len(line))
+        # the last assignment of a name is the one Django sees
+        self.assignments: dict[str, ast.Assign] = {}
+        for node in self.tree.body:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                self.assignments[node.targets[0].id] = node
+        self.edits: list[tuple[int, int, str]] = []
+        self.applied: list[str] = []
+        self.patch = ""
+
+    def _offsets(self, node: ast.AST) -> tuple[int, int]:
+        return self._line_starts[node.lineno - 1] + node.col_offset, self._line_starts[node.end_lineno - 1] + node.end_col_offset
+
+    def end(self, node: ast.AST) -> int:
+        return self._offsets(node)[1]
+
+    def segment(self, node: ast.AST) -> str:
+        start, end = self._offsets(node)
+        return self.data[start:end].decode()
+
+    def line(self, node: ast.AST) -> str | None:
+        """The source line of ``node`` without indentation, when nothing else is on it but a comma and a comment."""
+        if node.lineno != node.end_lineno:
+            return None
+        text = self.data[self._line_starts[node.lineno - 1] : self._line_starts[node.lineno]].decode().strip()
+        code, _, _ = text.partition("#")
+        return text if code.strip() in (self.segment(node), self.segment(node) + ",") else None
+
+    def literal(self, name: str):
+        """Value of a top-level setting written as a literal, ``None`` when missing or computed."""
+        node = self.assignments.get(name)
+        try:
+            return ast.literal_eval(node.value) if node is not None else None
+        except ValueError:
+            return None
+
+    def imports(self) -> set[str]:
+        names = set()
+        for node in self.tree.body:
+            if isinstance(node, ast.Import):
+                names.update(alias.asname or alias.name for alias in node.names)
+        return names
+
+    def _edit(self, start: int, end: int, text: str):
+        self.edits.append((start, end, text))
+        if self.patch not in self.applied:
+            self.applied.append(self.patch)
+
+    def replace(self, node: ast.AST, text: str):
+        self._edit(*self._offsets(node), text)
+
+    def insert(self, offset: int, text: str):
+        self._edit(offset, offset, text)
+
+    def insert_after(self, node: ast.AST, text: str):
+        self.insert(self.end(node), text)
+
+    def append(self, text: str):
+        prefix = "" if self.data.endswith(b"\n") or not self.data else "\n"
+        self.insert(len(self.data), prefix + text)
+
+    def render(self) -> str:
+        parts, position = [], 0
+        # stable sort: text inserted at the same place keeps the order of the patches
+        for start, end, text in sorted(self.edits, key=lambda edit: edit[:2]):
+            if start < position:
+                raise ValueError("patches changed overlapping parts of the file")
+            parts += [self.data[position:start], text.encode()]
+            position = end
+        parts.append(self.data[position:])
+        return b"".join(parts).decode()
+
+
+def _quoted(value: str, like: str) -> str:
+    # the quotes of the file around it, Django writes '' and start-project ""
+    quote = "'" if like.startswith("'") else '"'
+    return quote + value.replace("\\", "\\\\").replace(quote, "\\" + quote) + quote
+
+
+def house_middleware() -> list[str]:
+    middleware = list(settings_defaults.MIDDLEWARE)
+    middleware.insert(middleware.index("django.middleware.security.SecurityMiddleware") + 1, static_pipeline.MIDDLEWARE)
+    return middleware
+
+
+def patch_middleware(settings: SettingsFile, context: dict):
+    """Middleware start-project knows in its order, CORS and WhiteNoise added when their apps are installed."""
+    node = settings.assignments.get("MIDDLEWARE")
+    current = settings.literal("MIDDLEWARE")
+    if node is None or not isinstance(current, list):
+        return
+    apps = settings.literal("INSTALLED_APPS") or []
+    required = {CORS_MIDDLEWARE} if "corsheaders" in apps else set()
+    if static_pipeline.APP in apps:
+        required.add(static_pipeline.MIDDLEWARE)
+
+    order = house_middleware()
+    # known entries are sorted among the places they take, other entries stay where they are
+    slots = iter([item for item in order if item in current])
+    middleware, seen = [], set()
+    for item in current:
+        if item not in order:
+            middleware.append(item)
+        elif item not in seen:
+            seen.add(item)
+            middleware.append(next(slots))
+    for item in order:
+        if item in required and item not in middleware:
+            before = [known for known in order[: order.index(item)] if known in middleware]
+            middleware.insert(middleware.index(before[-1]) + 1 if before else 0, item)
+
+    if middleware != current:
+        # entries keep their own line, comments included
+        lines = {item.value: settings.line(item) for item in node.value.elts}
+        items = []
+        for item in middleware:
+            line = lines.get(item) or f'"{item}",'
+            code, comment, text = line.partition("#")
+            items.append(f"    {code.rstrip().rstrip(',')},{'  #' + text if comment else ''}")
+        settings.replace(node.value, "[\n" + "\n".join(items) + "\n]")
+
+
+def patch_cors(settings: SettingsFile, context: dict):
+    apps = settings.literal("INSTALLED_APPS") or []
+    if "corsheaders" in apps and not any(name in settings.assignments for name in CORS_SETTINGS):
+        settings.append("\nCORS_ALLOW_ALL_ORIGINS = True\n")
+
+
+def patch_static_roots(settings: SettingsFile, context: dict):
+    """MEDIA_URL, STATIC_ROOT and MEDIA_ROOT as the deploy option sets them.
+
+    Without a journal the deploy option is unknown, only missing settings are added then.
+    """
+    public = '"public", ' if context.get("deploy_option") == "mydevil" else ""
+    expected = {
+        "MEDIA_URL": '"media/"',
+        "STATIC_ROOT": f'os.path.join(BASE_DIR, {public}"static")',
+        "MEDIA_ROOT": f'os.path.join(BASE_DIR, {public}"media")',
+    }
+    missing, uses_os = [], False
+    for name, expression in expected.items():
+        node = settings.assignments.get(name)
+        if node is None:
+            missing.append(f"{name} = {expression}")
+        elif context.get("deploy_option") and ast.dump(node.value) != ast.dump(ast.parse(expression, mode="eval").body):
+            settings.replace(node.value, expression)
+        else:
+            continue
+        uses_os = uses_os or name.endswith("_ROOT")
+    if missing:
+        anchor = settings.assignments.get("STATIC_URL")
+        if anchor is not None:
+            settings.insert_after(anchor, "".join(f"\n{line}" for line in missing))
+        else:
+            settings.append("\n" + "".join(f"{line}\n" for line in missing))
+
+    if uses_os and "os" not in settings.imports():
+        imports = [node for node in settings.tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+        if imports:
+            settings.insert_after(imports[-1], "\nimport os")
+        else:
+            settings.insert(0, "import os\n")
+
+
+def patch_postgres(settings: SettingsFile, context: dict):
+    """The default PostgreSQL database gets the current engine name, its other keys are left alone."""
+    node = settings.assignments.get("DATABASES")
+    if node is None or not isinstance(node.value, ast.Dict):
+        return
+    default = None
+    for key, value in zip(node.value.keys, node.value.values):
+        if isinstance(key, ast.Constant) and key.value == "default" and isinstance(value, ast.Dict):
+            default = value
+    if default is None:
+        return
+    entries = {key.value: (key, value) for key, value in zip(default.keys, default.values) if isinstance(key, ast.Constant)}
+    engine = entries.get("ENGINE")
+    if engine is None or not isinstance(engine[1], ast.Constant) or engine[1].value not in POSTGRES_ENGINES:
+        return
+
+    house = settings_defaults.POSTGRESQL_DB["ENGINE"]
+    if engine[1].value != house:
+        settings.replace(engine[1], _quoted(house, settings.segment(engine[0])))
+
+
+PATCHES = {
+    "middleware": patch_middleware,
+    "cors": patch_cors,
+    "static-roots": patch_static_roots,
+    "postgres": patch_postgres,
+}
+
+
+def upgrade_source(source: str, context: dict) -> tuple[str, list[str]]:
+    """Patched ``source`` and the names of the patches that changed it."""
+    settings = SettingsFile(source)
+    for name, patch in PATCHES.items():
+        settings.patch = name
+        patch(settings, context)
+    return settings.render(), settings.applied
+
+
+def find_projects(root: str) -> list[dict]:
+    """Django folders below ``root`` with a ``config/settings.py``, and where their state is kept."""
+    jobs = []
+    for path, dirs, files in os.walk(root):
+        settings_path = os.path.join(path, "config", "settings.py")
+        if "manage.py" in files and os.path.isfile(settings_path):
+            dirs.clear()
+            project_dir = path
+            # the journal is in the project folder, one or two levels above the Django folder
+            for candidate in (path, os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+                if os.path.isfile(os.path.join(candidate, JOURNAL_PATH)):
+                    project_dir = candidate
+                    break
+            jobs.append({"settings": settings_path, "project_dir": project_dir})
+            continue
+        dirs[:] = sorted(name for name in dirs if name not in PRUNED and not name.startswith("."))
+    return jobs
+
+
+def _read_json(path: str) -> dict:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def upgrade_project(job: dict) -> dict:
+    """Worker: patch one settings file, or with ``dry_run`` only diff it."""
+    path = job["settings"]
+    result = {"path": path, "status": "up to date", "patches": [], "diff": None, "error": None}
+    state_path = os.path.join(job["project_dir"], STATE_PATH)
+    key = os.path.relpath(path, job["project_dir"])
+    display = os.path.relpath(path)
+    try:
+        with open(path, "rb") as settings_file:
+            data = settings_file.read()
+        state = _read_json(state_path)
+        digest = hashlib.sha256(data).hexdigest()
+        if not job["force"] and state.get("version") == VERSION and state.get("files", {}).get(key) == digest:
+            result["status"] = "skipped"
+            return result
+
+        source = data.decode()
+        context = {"deploy_option": _read_json(os.path.join(job["project_dir"], JOURNAL_PATH)).get("answers", {}).get("deploy_option")}
+        patched, result["patches"] = upgrade_source(source, context)
+    except (OSError, UnicodeDecodeError, SyntaxError, ValueError) as exc:
+        result.update(status="error", error=f"{type(exc).__name__}: {exc}")
+        return result
+
+    if patched != source:
+        result["status"] = "would patch" if job["dry_run"] else "patched"
+        if job["dry_run"]:
+            result["diff"] = "".join(difflib.unified_diff(source.splitlines(keepends=True), patched.splitlines(keepends=True), f"a/{display}", f"b/{display}"))
+        else:
+            write_atomic(path, patched.encode(), os.stat(path).st_mode & 0o777)
+    if not job["dry_run"]:
+        state = {"version": VERSION, "files": {**state.get("files", {}), key: hashlib.sha256(patched.encode()).hexdigest()}, "upgraded": time.time()}
+        write_atomic(state_path, json.dumps(state, indent=2).encode())
+    return result
+
+
+def run(jobs: list[dict], workers: int) -> list[dict]:
+    # a pool costs more than it saves for a handful of files
+    if workers == 1 or len(jobs) < 2 * workers:
+        return [upgrade_project(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(upgrade_project, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
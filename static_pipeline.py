@@ -0,0 +1,68 @@
+"""Opt-in static files pipeline for generated projects.
+
+collectstatic writes files with hashed names plus gzip and brotli variants,
+WhiteNoise serves the precompressed file matching Accept-Encoding and marks
+hashed files as immutable, so browsers cache them for good.
+"""
+
+PACKAGE = "whitenoise[brotli]"
+MIDDLEWARE = "whitenoise.middleware.WhiteNoiseMiddleware"
+# runserver serves static files through WhiteNoise as well, like production does
+APP = "whitenoise.runserver_nostatic"
+
+SETTINGS = """
+# static pipeline: hashed names, gzip and brotli variants built by collectstatic
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "config.storage.CompressedManifestStorage"},
+}
+# only hashed files are kept and compressed, {% static %} always points to them
+WHITENOISE_KEEP_ONLY_HASHED_FILES = True
+# hashed files get "max-age=315360000, immutable", this applies to the rest
+WHITENOISE_MAX_AGE = 3600
+"""
+
+STORAGE = '''import gzip
+import os
+
+from whitenoise.compress import Compressor
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class IncrementalCompressor(Compressor):
+    """Reuses .gz/.br files written from the same content by an earlier collectstatic.
+
+    Django saves hashed CSS and JS files again on every run, so the content is
+    compared, not the mtime: decompressing is much cheaper than brotli at
+    quality 11.
+    """
+
+    def compress(self, path):
+        with open(path, "rb") as f:
+            stat_result = os.fstat(f.fileno())
+            data = f.read()
+        suffixes = [suffix for suffix, used in ((".gz", self.use_gzip), (".br", self.use_brotli)) if used]
+        existing = [path + suffix for suffix in suffixes if os.path.exists(path + suffix)]
+        if existing and self.decompress(existing[0]) == data:
+            for compressed in existing:
+                os.utime(compressed, (stat_result.st_atime, stat_result.st_mtime))
+            return existing
+        return super().compress(path)
+
+    @staticmethod
+    def decompress(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if path.endswith(".gz"):
+            return gzip.decompress(data)
+        import brotli
+
+        return brotli.decompress(data)
+
+
+class CompressedManifestStorage(CompressedManifestStaticFilesStorage):
+    """Files are compressed on a thread pool by WhiteNoise, skipping those compressed before."""
+
+    def create_compressor(self, **kwargs):
+        return IncrementalCompressor(**kwargs)
+'''
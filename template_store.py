@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import re
+import zipfile
+
+from asset_provider import AssetProvider
+from fs_utils import cache_root, clone_file, write_atomic
+
+# {{name}} or {{ name }}, split() keeps the whole placeholder and the name
+PLACEHOLDER = re.compile(r"(\{\{\s*(\w+)\s*\}\})")
+IGNORED_NAMES = {".DS_Store", "__pycache__"}
+
+
+def compile_placeholders(text: str) -> list[str] | None:
+    """``[literal, placeholder, name, literal, ...]``, or ``None`` when ``text`` has no placeholders."""
+    segments = PLACEHOLDER.split(text)
+    return segments if len(segments) > 1 else None
+
+
+def render_segments(segments: list[str], context: dict[str, str]) -> str:
+    # placeholders missing from the context are kept, e.g. {{ user }} in a Django template
+    parts = [segments[0]]
+    for index in range(1, len(segments), 3):
+        placeholder, name, literal = segments[index : index + 3]
+        parts.append(context.get(name, placeholder))
+        parts.append(literal)
+    return "".join(parts)
+
+
+class TemplatePack:
+    """Files of one installed pack, ``files`` maps relative paths to manifest entries."""
+
+    def __init__(self, store: "TemplateStore", name: str, digest: str, files: dict[str, dict]):
+        self.store = store
+        self.name = name
+        self.digest = digest
+        self.files = files
+
+    def overlay(self, other: "TemplatePack") -> "TemplatePack":
+        """This pack with the files of ``other`` added, and replacing those with the same path."""
+        digest = hashlib.sha256(f"{self.digest}:{other.digest}".encode()).hexdigest()
+        return TemplatePack(self.store, f"{self.name}+{other.name}", digest, {**self.files, **other.files})
+
+    def members(self, path: str) -> list[str]:
+        prefix = path.rstrip("/") + "/"
+        return sorted(name for name in self.files if name == path or name.startswith(prefix))
+
+    def materialize(self, path: str, dest: str, context: dict[str, str] | None = None, hardlink: bool = False) -> list[str]:
+        """Write the file ``path``, or every file under the folder ``path``, to ``dest``.
+
+        Files are reflinked from the blobs, or copied where the file system cannot
+        do that. With ``hardlink`` they share the blob's inode and stay read-only,
+        which suits files nobody edits. Files using a placeholder from ``context``
+        are rendered and written as new files. Returns the written paths.
+        """
+        members = self.members(path)
+        if not members:
+            raise KeyError(f"There is no item named '{path}' in template '{self.name}'")
+
+        written = []
+        for member in members:
+            entry = self.files[member]
+            target = dest if member == path else os.path.join(dest, os.path.relpath(member, path))
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            if os.path.lexists(target):
+                os.remove(target)
+            segments = entry.get("segments")
+            if context and segments and any(name in context for name in segments[2::3]):
+                with open(target, "w") as file:
+                    file.write(render_segments(segments, context))
+                os.chmod(target, entry["mode"])
+            else:
+                blob = self.store.blob_path(entry["blob"])
+                clone_file(blob, target, hardlink=hardlink)
+                if not os.path.samestat(os.stat(blob), os.stat(target)):
+                    os.chmod(target, entry["mode"])
+            written.append(target)
+        return written
+
+
+class TemplateStore:
+    """Template packs kept by content.
+
+    ``<cache>/templates/blobs/<sha256>`` holds file contents, shared by every
+    pack and every version of a pack, so installing a changed pack only writes
+    the files that changed. ``<cache>/templates/packs/<name>/<digest>.json`` is a
+    manifest mapping paths to blobs, with the placeholder substitutions of every
+    text file compiled once at install time. ``current`` names the digest used
+    for new projects.
+    """
+
+    def __init__(self, root: str | None = None):
+        self.root = root or os.path.join(cache_root(), "templates")
+        self._packs: dict[tuple[str, str], TemplatePack] = {}
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def _add_blob(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            # blobs can be hardlinked into projects, read-only keeps them from being edited there
+            write_atomic(path, data, 0o444)
+        return digest
+
+    def _pack_dir(self, name: str) -> str:
+        return os.path.join(self.root, "packs", name)
+
+    def install(self, name: str, files: list[tuple[str, bytes, int]]) -> TemplatePack:
+        """Store ``(path, content, mode)`` files as the current version of pack ``name``."""
+        entries = {}
+        for path, data, mode in files:
+            entry = {"blob": self._add_blob(data), "mode": mode or 0o644}
+            try:
+                segments = compile_placeholders(data.decode())
+            except UnicodeDecodeError:
+                segments = None
+            if segments:
+                entry["segments"] = segments
+            entries[path] = entry
+
+        manifest = json.dumps({"name": name, "files": entries}, sort_keys=True).encode()
+        digest = hashlib.sha256(manifest).hexdigest()
+        manifest_path = os.path.join(self._pack_dir(name), f"{digest}.json")
+        if not os.path.exists(manifest_path):
+            write_atomic(manifest_path, manifest)
+        write_atomic(os.path.join(self._pack_dir(name), "current"), digest.encode())
+        pack = TemplatePack(self, name, digest, entries)
+        self._packs[(name, digest)] = pack
+        return pack
+
+    def install_zip(self, name: str, assets: AssetProvider) -> TemplatePack:
+        # the same archive is installed once, later runs only read its manifest
+        source_path = os.path.join(self._pack_dir(name), "sources", assets.digest)
+        try:
+            with open(source_path) as source:
+                return self.open(name, source.read().strip())
+        except (OSError, KeyError):
+            pass
+
+        files = []
+        for info in assets.infolist():
+            if info.is_dir() or IGNORED_NAMES.intersection(info.filename.split("/")):
+                continue
+            files.append((info.filename, assets.read_bytes(info.filename), info.external_attr >> 16 & 0o777))
+        pack = self.install(name, files)
+        write_atomic(source_path, pack.digest.encode())
+        return pack
+
+    def install_dir(self, name: str, path: str) -> TemplatePack:
+        files = []
+        for root, dirs, file_names in os.walk(path):
+            dirs[:] = sorted(dir_name for dir_name in dirs if dir_name not in IGNORED_NAMES)
+            for file_name in sorted(file_names):
+                if file_name in IGNORED_NAMES:
+                    continue
+                file_path = os.path.join(root, file_name)
+                with open(file_path, "rb") as file:
+                    data = file.read()
+                files.append((os.path.relpath(file_path, path).replace(os.sep, "/"), data, os.stat(file_path).st_mode & 0o777))
+        return self.install(name, files)
+
+    def install_path(self, path: str) -> TemplatePack:
+        """Install a template folder or zip archive, named after the file."""
+        name = re.sub(r"[^A-Za-z0-9._-]+", "-", os.path.splitext(os.path.basename(os.path.abspath(path)))[0]) or "template"
+        if os.path.isdir(path):
+            return self.install_dir(name, path)
+        if zipfile.is_zipfile(path):
+            assets = AssetProvider(path)
+            try:
+                return self.install_zip(name, assets)
+            finally:
+                assets.close()
+        raise ValueError(f"{path} is neither a folder nor a zip archive")
+
+    def open(self, name: str, digest: str | None = None) -> TemplatePack:
+        """An installed pack, by default its current version."""
+        if digest is None:
+            try:
+                with open(os.path.join(self._pack_dir(name), "current")) as current:
+                    digest = current.read().strip()
+            except OSError:
+                raise KeyError(f"Template '{name}' is not installed") from None
+        if (name, digest) not in self._packs:
+            try:
+                with open(os.path.join(self._pack_dir(name), f"{digest}.json")) as manifest:
+                    files = json.load(manifest)["files"]
+            except (OSError, ValueError):
+                raise KeyError(f"Template '{name}' has no version {digest}") from None
+            if not all(os.path.exists(self.blob_path(entry["blob"])) for entry in files.values()):
+                raise KeyError(f"Template '{name}' is missing files, install it again")
+            self._packs[(name, digest)] = TemplatePack(self, name, digest, files)
+        return self._packs[(name, digest)]
+
+    def resolve(self, template: str) -> TemplatePack:
+        """``--template``: a folder or zip archive to install, or the name of an installed pack."""
+        if os.path.exists(template):
+            return self.install_path(template)
+        return self.open(template)
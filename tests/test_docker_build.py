@@ -0,0 +1,148 @@
+import os
+
+import pytest
+
+import docker_build
+from docker_build import DockerBuilder, ProjectLayout
+
+
+class FakeBuildx:
+    def __init__(self):
+        self.builds = []
+
+    def build(self, **options):
+        self.builds.append(options)
+
+
+class FakeDocker:
+    def __init__(self):
+        self.buildx = FakeBuildx()
+
+
+def write(path: str, content: str = ""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def make_project(root: str, requirements: str, wheels: list[str]) -> str:
+    django_dir = os.path.join(root, "django")
+    write(os.path.join(django_dir, "manage.py"))
+    write(os.path.join(django_dir, "requirements.txt"), requirements)
+    for name in wheels:
+        write(os.path.join(django_dir, "wheelhouse", name))
+    return django_dir
+
+
+def linux_wheel(name: str) -> str:
+    # manylinux2014_<arch> of this machine, the image is built for it
+    platform_tag = docker_build.lockfile.linux_target(docker_build.DEFAULT_PYTHON_VERSION).platforms[-1]
+    return f"{name}-cp312-cp312-{platform_tag}.whl"
+
+
+HASHED = """# pinned by yadpm from the packages installed in venv
+# offline install: pip install --no-index --find-links wheelhouse -r requirements.txt
+Django==5.2 \\
+    --hash=sha256:aaaa
+brotli==1.2.0 \\
+    --hash=sha256:bbbb
+"""
+
+
+@pytest.fixture
+def layout(tmp_path) -> ProjectLayout:
+    return ProjectLayout(root=str(tmp_path / "shop"), django_dir=str(tmp_path / "shop" / "django"), nextjs_dir=str(tmp_path / "shop" / "www"))
+
+
+def test_build_options_inline_cache(layout):
+    builder = DockerBuilder(docker=FakeDocker())
+    django, nextjs = (builder.build_options(image) for image in builder.images(layout))
+
+    assert django["tags"] == ["shop-django:latest"]
+    assert nextjs["tags"] == ["shop-nextjs:latest"]
+    assert django["cache_from"] == "shop-django:latest"
+    assert django["cache_to"] == {"type": "inline"}
+    assert django["file"] == os.path.join(layout.django_dir, "Dockerfile")
+    assert (django["load"], django["push"]) == (True, False)
+
+
+def test_build_options_registry_cache_and_push(layout):
+    builder = DockerBuilder(docker=FakeDocker(), image_prefix="ghcr.io/me/shop", cache_registry="ghcr.io/me/cache/", push=True)
+    options = builder.build_options(builder.images(layout)[0])
+
+    assert options["tags"] == ["ghcr.io/me/shop-django:latest"]
+    assert options["cache_from"] == {"type": "registry", "ref": "ghcr.io/me/cache/shop-django:buildcache"}
+    assert options["cache_to"] == {"type": "registry", "ref": "ghcr.io/me/cache/shop-django:buildcache", "mode": "max"}
+    assert (options["load"], options["push"]) == (False, True)
+
+
+def test_build_runs_every_image_on_the_client(layout):
+    docker = FakeDocker()
+    builder = DockerBuilder(docker=docker)
+
+    assert builder.build(layout) == ["shop-django:latest", "shop-nextjs:latest"]
+    assert [build["context_path"] for build in docker.buildx.builds] == [layout.django_dir, layout.nextjs_dir]
+    assert all(build["target"] == "runtime" for build in docker.buildx.builds)
+
+
+def test_offline_dockerfile_builds_from_the_project_wheelhouse(tmp_path):
+    make_project(str(tmp_path), HASHED + "gunicorn==23.0 \\\n    --hash=sha256:cccc\n", ["django-5.2-py3-none-any.whl", linux_wheel("brotli-1.2.0"), "gunicorn-23.0-py3-none-any.whl"])
+    layout = docker_build.analyse(str(tmp_path))
+    dockerfile = docker_build.django_dockerfile(layout)
+
+    assert layout.lock_dir == "."
+    assert "COPY requirements.txt requirements.txt" in dockerfile
+    assert "--mount=type=bind,source=wheelhouse,target=/wheelhouse" in dockerfile
+    assert "pip wheel --no-index --find-links /wheelhouse --wheel-dir /wheels -r requirements.txt\n" in dockerfile
+    assert "build-essential" not in dockerfile
+
+
+def test_online_dockerfile_installs_pins_without_hashes(tmp_path):
+    # a standalone project locked on macOS: the hashes cannot match the Linux builder, gunicorn is not locked
+    django_dir = make_project(str(tmp_path), HASHED, ["django-5.2-py3-none-any.whl", "brotli-1.2.0-cp312-cp312-macosx_11_0_arm64.whl"])
+    layout = docker_build.analyse(str(tmp_path))
+    docker_build.write_dockerfiles(layout)
+    with open(os.path.join(django_dir, "Dockerfile")) as dockerfile_file:
+        dockerfile = dockerfile_file.read()
+    with open(os.path.join(django_dir, docker_build.IMAGE_LOCK_DIR, "requirements.txt")) as requirements:
+        image_requirements = requirements.read()
+
+    assert layout.lock_dir is None
+    assert "/wheelhouse" not in dockerfile
+    assert f"COPY {docker_build.IMAGE_LOCK_DIR}/requirements.txt requirements.txt" in dockerfile
+    assert "pip wheel --wheel-dir /wheels -r requirements.txt gunicorn\n" in dockerfile
+    # pip switches to require-hashes mode for any hash, the bare gunicorn would fail then
+    assert "--hash" not in image_requirements
+    assert "Django==5.2\nbrotli==1.2.0\n" in image_requirements
+
+
+def test_image_lockfile_is_preferred_over_a_foreign_one(tmp_path):
+    django_dir = make_project(str(tmp_path), HASHED, ["brotli-1.2.0-cp312-cp312-macosx_11_0_arm64.whl"])
+    lock_dir = os.path.join(django_dir, docker_build.IMAGE_LOCK_DIR)
+    write(os.path.join(lock_dir, "requirements.txt"), HASHED + "gunicorn==23.0 \\\n    --hash=sha256:cccc\n")
+    for name in ("django-5.2-py3-none-any.whl", linux_wheel("brotli-1.2.0"), "gunicorn-23.0-py3-none-any.whl"):
+        write(os.path.join(lock_dir, "wheelhouse", name))
+    layout = docker_build.analyse(str(tmp_path))
+    dockerfile = docker_build.django_dockerfile(layout)
+
+    assert layout.lock_dir == docker_build.IMAGE_LOCK_DIR
+    assert f"COPY {docker_build.IMAGE_LOCK_DIR}/requirements.txt requirements.txt" in dockerfile
+    assert f"source={docker_build.IMAGE_LOCK_DIR}/wheelhouse" in dockerfile
+    assert f"RUN rm -rf /app/wheelhouse /app/{docker_build.IMAGE_LOCK_DIR}" in dockerfile
+
+
+@pytest.mark.parametrize(
+    ("config", "expected"),
+    [
+        ("const nextConfig: NextConfig = {};\n", 'const nextConfig: NextConfig = {\n  output: "standalone",\n};\n'),
+        (
+            "const nextConfig: NextConfig = {\n  /* config options here */\n};\n",
+            'const nextConfig: NextConfig = {\n  output: "standalone",\n  /* config options here */\n};\n',
+        ),
+    ],
+)
+def test_patch_next_config_puts_output_on_its_own_line(tmp_path, config, expected):
+    write(str(tmp_path / "next.config.ts"), config)
+
+    assert docker_build.patch_next_config(str(tmp_path))
+    assert (tmp_path / "next.config.ts").read_text() == expected
@@ -0,0 +1,119 @@
+"""update_project_files runs again on --resume, on top of the files it already edited."""
+
+import os
+
+import pytest
+
+from project_manager import DjangoProjectManager
+
+RUNTIME_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runtime")
+
+# the parts of `django-admin startproject config .` the step edits
+SETTINGS = """from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+SECRET_KEY = 'django-insecure-x'
+
+DEBUG = True
+
+ALLOWED_HOSTS = []
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+}
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'UTC'
+
+STATIC_URL = 'static/'
+"""
+
+URLS = """from django.contrib import admin
+from django.urls import path
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+]
+"""
+
+ALL_PACKAGES = ["django-ninja", "djangorestframework", "django-cors-headers", "users", "psycopg2", "whitenoise[brotli]"]
+
+
+def make_manager(project_dir: str, packages: list[str], profile: str) -> DjangoProjectManager:
+    manager = DjangoProjectManager()
+    manager.PROJECT_DIR = project_dir
+    manager.RUNTIME_DIR = RUNTIME_DIR
+    manager.apply_answers(
+        {
+            "deploy_option": "mydevil",
+            "to_install": [*DjangoProjectManager.to_install, *packages],
+            "performance_profile": profile,
+            "create_next_js": False,
+            "nextjs_project_name": None,
+            "superuser": {"email": "admin@example.com"},
+        },
+    )
+    os.makedirs(os.path.dirname(manager.SETTINGS_PATH))
+    with open(manager.SETTINGS_PATH, "w") as settings:
+        settings.write(SETTINGS)
+    with open(manager.URLS_PATH, "w") as urls:
+        urls.write(URLS)
+    return manager
+
+
+def read(path: str) -> str:
+    with open(path) as file:
+        return file.read()
+
+
+@pytest.mark.parametrize(("packages", "profile"), [(ALL_PACKAGES, "redis"), (ALL_PACKAGES[:3], "default"), ([], "none")])
+def test_rerun_leaves_files_unchanged(tmp_path, packages, profile):
+    manager = make_manager(str(tmp_path), packages, profile)
+    env_path = os.path.join(manager.DJANGO_DIR, ".env")
+    manager.update_project_files()
+    written = {path: read(path) for path in (manager.SETTINGS_PATH, manager.URLS_PATH, env_path)}
+
+    rerun = DjangoProjectManager()
+    rerun.PROJECT_DIR = manager.PROJECT_DIR
+    rerun.RUNTIME_DIR = RUNTIME_DIR
+    rerun.apply_answers(manager.journal_answers())
+    rerun.update_project_files()
+
+    assert {path: read(path) for path in written} == written
+    assert read(manager.SETTINGS_PATH).count("from decouple import config") == 1
+
+
+def test_rerun_keeps_user_edits(tmp_path):
+    manager = make_manager(str(tmp_path), ALL_PACKAGES, "default")
+    manager.update_project_files()
+    edited = read(manager.SETTINGS_PATH).replace('"users",', '"users",\n    "shop",').replace("<db_name>", "shop")
+    with open(manager.SETTINGS_PATH, "w") as settings:
+        settings.write(edited)
+
+    manager.update_project_files()
+
+    assert read(manager.SETTINGS_PATH) == edited
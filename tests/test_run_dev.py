@@ -0,0 +1,7 @@
+from run_dev import Service
+
+
+def test_string_command_keeps_quoted_arguments():
+    service = Service.from_dict({"name": "check", "command": "python -c 'print(1)' --flag \"a b\""})
+
+    assert service.command == ["python", "-c", "print(1)", "--flag", "a b"]
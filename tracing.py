@@ -0,0 +1,179 @@
+import json
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+from fs_utils import dir_size
+
+
+class Span:
+    def __init__(self, name: str, category: str, parent: "Span | None" = None):
+        self.name = name
+        self.category = category
+        self.parent = parent
+        self.thread = threading.current_thread().name
+        self.start = time.perf_counter()
+        self.end = self.start
+        self.cpu = 0.0
+        self.children_cpu = 0.0
+        self.exit_codes: list[int] = []
+        self.bytes_written = 0
+
+    @property
+    def wall(self) -> float:
+        return self.end - self.start
+
+
+class Tracer:
+    """Records steps and the subprocesses they spawn.
+
+    A step records wall time, CPU time of its thread, CPU time of its child
+    processes (from ``wait4``), their exit codes and how much the project tree
+    grew while it ran. Steps running at the same time all see the growth of the
+    tree, so ``bytes_written`` of parallel steps overlaps.
+    With ``enabled=False`` subprocesses are still run, nothing is recorded.
+    With ``measure_size=False`` the tree is not walked and ``bytes_written`` stays 0.
+    """
+
+    def __init__(self, enabled: bool = False, root: str | None = None, measure_size: bool = True):
+        self.enabled = enabled
+        self.root = root
+        self.measure_size = measure_size
+        self.spans: list[Span] = []
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _tree_size(self) -> int | None:
+        if not self.measure_size:
+            return None
+        if self.root is None or not os.path.isdir(self.root):
+            return 0
+        # other steps change the tree meanwhile, profiling must never fail a step
+        try:
+            return dir_size(self.root)
+        except OSError:
+            return None
+
+    @contextmanager
+    def step(self, name: str):
+        if not self.enabled:
+            yield None
+            return
+
+        parent = getattr(self._local, "span", None)
+        span = Span(name, "step", parent)
+        self._local.span = span
+        size_before = self._tree_size()
+        cpu_before = time.thread_time()
+        try:
+            yield span
+        finally:
+            span.cpu = time.thread_time() - cpu_before
+            size_after = self._tree_size()
+            if size_before is not None and size_after is not None:
+                span.bytes_written = size_after - size_before
+            span.end = time.perf_counter()
+            self._local.span = parent
+            with self._lock:
+                self.spans.append(span)
+
+    def run(
+        self,
+        args: list[str],
+        cwd: str | None = None,
+        input: str | None = None,
+        capture: bool = False,
+        env: dict[str, str] | None = None,
+    ) -> tuple[int, str]:
+        """Run ``args`` without a shell and return its exit code and, with ``capture``, its stdout."""
+        parent = getattr(self._local, "span", None)
+        span = Span(" ".join(os.path.basename(arg) if i == 0 else arg for i, arg in enumerate(args[:2])), "subprocess", parent)
+        output = ""
+        try:
+            proc = subprocess.Popen(
+                args,
+                cwd=cwd,
+                env={**os.environ, **env} if env else None,
+                stdin=subprocess.PIPE if input is not None else None,
+                stdout=subprocess.PIPE if capture else None,
+                text=True,
+            )
+        except FileNotFoundError:
+            return 127, output
+
+        if input is not None:
+            proc.stdin.write(input)
+            proc.stdin.close()
+        if capture:
+            output = proc.stdout.read()
+            proc.stdout.close()
+        # wait4 instead of proc.wait() gives the resource usage of this child only
+        _, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+        if self.enabled:
+            span.end = time.perf_counter()
+            span.children_cpu = rusage.ru_utime + rusage.ru_stime
+            span.exit_codes.append(proc.returncode)
+            with self._lock:
+                self.spans.append(span)
+            if parent is not None:
+                parent.children_cpu += span.children_cpu
+                parent.exit_codes.append(proc.returncode)
+        return proc.returncode, output
+
+    def summary(self) -> list[dict]:
+        return [
+            {
+                "step": span.name,
+                "wall_s": round(span.wall, 3),
+                "cpu_s": round(span.cpu, 3),
+                "children_cpu_s": round(span.children_cpu, 3),
+                "exit_codes": span.exit_codes,
+                "bytes_written": span.bytes_written,
+            }
+            for span in sorted(self.spans, key=lambda s: s.start)
+            if span.category == "step"
+        ]
+
+    def format_summary(self) -> str:
+        lines = [f"{'step':<28}{'wall s':>9}{'cpu s':>9}{'child cpu s':>13}{'exit':>8}{'MB written':>12}"]
+        for row in self.summary():
+            exit_code = max(row["exit_codes"], key=abs, default="-")
+            mb = row["bytes_written"] / 1024 / 1024
+            lines.append(f"{row['step']:<28}{row['wall_s']:>9.2f}{row['cpu_s']:>9.2f}{row['children_cpu_s']:>13.2f}{exit_code!s:>8}{mb:>12.1f}")
+        total = max((s.end for s in self.spans), default=self.origin) - self.origin
+        lines.append(f"{'total':<28}{total:>9.2f}")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict:
+        pid = os.getpid()
+        threads = {name: i for i, name in enumerate(dict.fromkeys(s.thread for s in sorted(self.spans, key=lambda s: s.start)))}
+        events: list[dict] = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}} for name, tid in threads.items()]
+        for span in self.spans:
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "pid": pid,
+                    "tid": threads[span.thread],
+                    "ts": round((span.start - self.origin) * 1_000_000),
+                    "dur": round(span.wall * 1_000_000),
+                    "args": {
+                        "cpu_s": round(span.cpu, 3),
+                        "children_cpu_s": round(span.children_cpu, 3),
+                        "exit_codes": span.exit_codes,
+                        "bytes_written": span.bytes_written,
+                    },
+                },
+            )
+        # chrome://tracing and Perfetto ignore unknown top level keys
+        return {"traceEvents": events, "displayTimeUnit": "ms", "summary": self.summary()}
+
+    def write(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.chrome_trace(), file, indent=1)
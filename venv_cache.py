@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+
+from fs_utils import cache_root, copy_tree, file_lock
+
+DEFAULT_MAX_SIZE_MB = 2048
+MARKER = ".yadpm-venv.json"
+
+
+def python_version(python: str = "python3") -> str:
+    result = subprocess.run(
+        [python, "-c", "import platform, sys; print(sys.version); print(platform.platform()); print(sys.base_prefix)"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.strip()
+
+
+def _is_relocatable(rel_path: str) -> bool:
+    # console scripts, activate scripts and pyvenv.cfg contain the absolute venv path
+    return rel_path == "pyvenv.cfg" or rel_path.startswith("bin" + os.sep)
+
+
+class VenvCache:
+    """Ready-built virtual environments keyed by interpreter and package selection.
+
+    Entries live in ``<cache>/venvs/<key>`` and are materialized into a project by
+    hardlinks (or reflinks when the cache is on another filesystem). Least recently
+    used entries are removed once the cache grows over ``max_size`` bytes.
+    """
+
+    def __init__(self, root: str | None = None, max_size: int | None = None):
+        self.root = root or os.path.join(cache_root(), "venvs")
+        if max_size is None:
+            max_size = int(os.environ.get("YADPM_VENV_CACHE_SIZE_MB", DEFAULT_MAX_SIZE_MB)) * 1024 * 1024
+        self.max_size = max_size
+
+    @staticmethod
+    def key(python: str, packages: list[str]) -> str:
+        payload = json.dumps({"python": python, "packages": sorted(set(packages))}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _read_marker(self, key: str) -> dict | None:
+        try:
+            with open(os.path.join(self.path(key), MARKER)) as marker:
+                return json.load(marker)
+        except (OSError, ValueError):
+            return None
+
+    def has(self, key: str) -> bool:
+        return self._read_marker(key) is not None
+
+    def _lock(self, shared: bool = False):
+        # eviction must not remove an entry another process is copying from
+        return file_lock(os.path.join(self.root, ".lock"), shared=shared)
+
+    def materialize(self, key: str, venv_dir: str) -> bool:
+        if not self.has(key):
+            return False
+        with self._lock(shared=True):
+            if not self.has(key):
+                return False
+            entry = self.path(key)
+            copy_tree(entry, venv_dir, replace=(entry, venv_dir), should_replace=_is_relocatable)
+            os.remove(os.path.join(venv_dir, MARKER))
+            os.utime(os.path.join(entry, MARKER))  # LRU timestamp
+        return True
+
+    def store(self, key: str, venv_dir: str, packages: list[str]):
+        if self.has(key):
+            return
+        with self._lock():
+            # another process may have stored the same packages while this one waited
+            if not self.has(key):
+                self._store(key, venv_dir, packages)
+
+    def _store(self, key: str, venv_dir: str, packages: list[str]):
+        os.makedirs(self.root, exist_ok=True)
+        entry = self.path(key)
+        temp_entry = f"{entry}.tmp-{os.getpid()}"
+        if os.path.exists(temp_entry):
+            shutil.rmtree(temp_entry)
+
+        # scripts are rewritten to the final entry path, the rename below makes them valid
+        size = copy_tree(venv_dir, temp_entry, replace=(venv_dir, entry), should_replace=_is_relocatable)
+        with open(os.path.join(temp_entry, MARKER), "w") as marker:
+            json.dump({"packages": sorted(packages), "size": size, "created": time.time()}, marker)
+
+        if os.path.exists(entry):
+            shutil.rmtree(entry)  # leftover without marker
+        try:
+            os.rename(temp_entry, entry)
+        except OSError:
+            shutil.rmtree(temp_entry, ignore_errors=True)
+            return
+        self.evict(keep=key)
+
+    def evict(self, keep: str | None = None):
+        entries = []
+        for key in os.listdir(self.root):
+            if ".tmp-" in key:
+                continue
+            marker = self._read_marker(key)
+            if marker is None:
+                continue
+            last_used = os.path.getmtime(os.path.join(self.path(key), MARKER))
+            entries.append((last_used, key, marker.get("size", 0)))
+
+        total = sum(size for _, _, size in entries)
+        for _, key, size in sorted(entries):
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self.path(key), ignore_errors=True)
+            total -= size
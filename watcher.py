@@ -0,0 +1,326 @@
+"""File watcher used by the dev runner to restart Django on changes.
+
+``create_watcher`` picks inotify on Linux, kqueue on macOS and falls back to
+polling (the StatReloader approach: stat every file once per interval) when
+neither is available or the watch limit is reached.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+from typing import AsyncIterator
+
+IGNORE_DIRS = {"venv", ".venv", "static", "media", "node_modules", "__pycache__", ".git", ".yadpm", ".next"}
+RELOAD_SUFFIXES = (".py", ".html", ".txt", ".mo")
+RELOAD_NAMES = {".env"}
+
+
+class Watcher:
+    def __init__(self, root: str, ignore_dirs: set[str] = IGNORE_DIRS):
+        self.root = os.path.abspath(root)
+        self.ignore_dirs = ignore_dirs
+
+    def directories(self, top: str):
+        for dir_path, dir_names, _ in os.walk(top):
+            dir_names[:] = [name for name in dir_names if name not in self.ignore_dirs]
+            yield dir_path
+
+    def ignored(self, path: str) -> bool:
+        relative = os.path.relpath(path, self.root)
+        return any(part in self.ignore_dirs for part in relative.split(os.sep)[:-1])
+
+    def relevant(self, path: str) -> bool:
+        name = os.path.basename(path)
+        return (name in RELOAD_NAMES or name.endswith(RELOAD_SUFFIXES)) and not self.ignored(path)
+
+    def fileno(self) -> int | None:
+        """Descriptor that becomes readable on changes, ``None`` when ``read`` has to be polled."""
+        return None
+
+    def read(self) -> set[str]:
+        """Relevant paths changed since the last call."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    async def changes(self, debounce: float = 0.2, interval: float = 1.0) -> AsyncIterator[set[str]]:
+        """Yield batches of changed paths, a batch ends after ``debounce`` seconds without events."""
+        loop = asyncio.get_running_loop()
+        pending: set[str] = set()
+        event = asyncio.Event()
+
+        def collect():
+            changed = self.read()
+            if changed:
+                pending.update(changed)
+                event.set()
+
+        fd = self.fileno()
+        if fd is not None:
+            loop.add_reader(fd, collect)
+        try:
+            while True:
+                if fd is None:
+                    await asyncio.sleep(interval)
+                    collect()
+                    if not pending:
+                        continue
+                else:
+                    await event.wait()
+                    while True:
+                        event.clear()
+                        try:
+                            await asyncio.wait_for(event.wait(), timeout=debounce)
+                        except asyncio.TimeoutError:
+                            break
+                event.clear()
+                batch = set(pending)
+                pending.clear()
+                yield batch
+        finally:
+            if fd is not None:
+                loop.remove_reader(fd)
+
+
+class PollingWatcher(Watcher):
+    def __init__(self, root: str, ignore_dirs: set[str] = IGNORE_DIRS):
+        super().__init__(root, ignore_dirs)
+        self.snapshot = self._scan()
+
+    def _scan(self) -> dict[str, float]:
+        mtimes = {}
+        for dir_path in self.directories(self.root):
+            try:
+                entries = os.scandir(dir_path)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_file() and self.relevant(entry.path):
+                        try:
+                            mtimes[entry.path] = entry.stat().st_mtime_ns
+                        except OSError:
+                            pass
+        return mtimes
+
+    def read(self) -> set[str]:
+        snapshot = self._scan()
+        changed = {path for path, mtime in snapshot.items() if self.snapshot.get(path) != mtime}
+        changed.update(self.snapshot.keys() - snapshot.keys())
+        self.snapshot = snapshot
+        return changed
+
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher(Watcher):
+    """inotify through ctypes; watches are per directory, new directories are added as they appear."""
+
+    MASK = IN_CLOSE_WRITE | IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+
+    def __init__(self, root: str, ignore_dirs: set[str] = IGNORE_DIRS):
+        super().__init__(root, ignore_dirs)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths: dict[int, str] = {}
+        try:
+            self._add_tree(self.root)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_tree(self, top: str):
+        for dir_path in self.directories(top):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dir_path), self.MASK)
+            if wd < 0:
+                code = ctypes.get_errno()
+                if code in (errno.ENOENT, errno.ENOTDIR):  # removed while walking
+                    continue
+                raise OSError(code, f"inotify_add_watch failed for {dir_path}: {os.strerror(code)}")
+            self.paths[wd] = dir_path
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def read(self) -> set[str]:
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size : offset + _EVENT.size + length].rstrip(b"\0")
+                offset += _EVENT.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    changed.add(self.root)
+                    continue
+                if mask & IN_IGNORED:
+                    self.paths.pop(wd, None)
+                    continue
+                directory = self.paths.get(wd)
+                if directory is None:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and os.path.basename(path) not in self.ignore_dirs:
+                        try:
+                            self._add_tree(path)
+                        except OSError:  # watch limit reached, changes below path are missed
+                            pass
+                        changed.update(p for p in self._files(path) if self.relevant(p))
+                elif self.relevant(path):
+                    changed.add(path)
+        return changed
+
+    def _files(self, top: str):
+        for dir_path in self.directories(top):
+            try:
+                yield from (os.path.join(dir_path, name) for name in os.listdir(dir_path))
+            except OSError:
+                pass
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class KqueueWatcher(Watcher):
+    """kqueue vnode events; every directory and every relevant file needs an open descriptor."""
+
+    O_EVTONLY = 0x8000  # macOS, open only for event notifications
+
+    def __init__(self, root: str, ignore_dirs: set[str] = IGNORE_DIRS):
+        super().__init__(root, ignore_dirs)
+        self.kq = select.kqueue()
+        self.fds: dict[int, str] = {}
+        self.paths: dict[str, int] = {}
+        self._raise_fd_limit()
+        try:
+            self._add_dir(self.root)
+        except OSError:
+            self.close()
+            raise
+
+    @staticmethod
+    def _raise_fd_limit():
+        import resource
+
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = 65536 if hard == resource.RLIM_INFINITY else min(hard, 65536)
+        if soft != resource.RLIM_INFINITY and soft < wanted:
+            try:
+                resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+            except (ValueError, OSError):
+                pass
+
+    def _add(self, path: str):
+        if path in self.paths:
+            return
+        try:
+            fd = os.open(path, self.O_EVTONLY if sys.platform == "darwin" else os.O_RDONLY)
+        except FileNotFoundError:
+            return
+        event = select.kevent(
+            fd,
+            filter=select.KQ_FILTER_VNODE,
+            flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+            fflags=select.KQ_NOTE_WRITE | select.KQ_NOTE_EXTEND | select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME | select.KQ_NOTE_ATTRIB,
+        )
+        self.kq.control([event], 0, 0)
+        self.fds[fd] = path
+        self.paths[path] = fd
+
+    def _remove(self, path: str):
+        fd = self.paths.pop(path, None)
+        if fd is not None:
+            self.fds.pop(fd, None)
+            os.close(fd)  # closing the descriptor removes its kevent
+
+    def _add_dir(self, dir_path: str) -> set[str]:
+        """Watch ``dir_path``, its relevant files and new subdirectories, return the files that were not watched yet."""
+        self._add(dir_path)
+        added = set()
+        try:
+            entries = os.scandir(dir_path)
+        except OSError:
+            return added
+        with entries:
+            for entry in entries:
+                if entry.path in self.paths:
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in self.ignore_dirs:
+                        added.update(self._add_dir(entry.path))
+                elif entry.is_file() and self.relevant(entry.path):
+                    self._add(entry.path)
+                    added.add(entry.path)
+        return added
+
+    def fileno(self) -> int:
+        return self.kq.fileno()
+
+    def read(self) -> set[str]:
+        changed = set()
+        for event in self.kq.control(None, 1024, 0):
+            path = self.fds.get(event.ident)
+            if path is None:
+                continue
+            gone = event.fflags & (select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME)
+            if os.path.isdir(path) and not gone:
+                # a write to a directory means entries were added or removed
+                changed.update(self._add_dir(path))
+                for watched in [p for p in self.paths if os.path.dirname(p) == path and not os.path.exists(p)]:
+                    self._remove(watched)
+                    if self.relevant(watched):
+                        changed.add(watched)
+                continue
+            if gone:
+                self._remove(path)
+                if os.path.exists(path):  # replaced by a new file, e.g. an editor saving atomically
+                    self._add(path)
+            if self.relevant(path):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        for path in list(self.paths):
+            self._remove(path)
+        self.kq.close()
+
+
+def create_watcher(root: str, ignore_dirs: set[str] = IGNORE_DIRS) -> Watcher:
+    try:
+        if sys.platform.startswith("linux"):
+            return InotifyWatcher(root, ignore_dirs)
+        if hasattr(select, "kqueue"):
+            return KqueueWatcher(root, ignore_dirs)
+    except (OSError, AttributeError):  # watch or descriptor limit reached, no inotify in libc
+        pass
+    return PollingWatcher(root, ignore_dirs)